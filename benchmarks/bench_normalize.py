@@ -0,0 +1,83 @@
+'''Micro-benchmark of posting date normalization, the per-posting step of the scrape hot loop.
+
+Compares `PostingNormalizer` with the previous implementation, which compiled its pattern and read the clock for
+every posting, over a mix of English and localized "posted" strings as found on results pages.
+
+Usage (from the main directory):
+
+    python -m benchmarks.bench_normalize --postings 100000
+'''
+import argparse
+from datetime import datetime, timedelta
+import json
+from pathlib import Path
+import random
+import re
+import tempfile
+import time
+
+from indeedjobs import Config
+from indeedjobs.normalize import PostingNormalizer
+
+
+POSTED_STRINGS: list[str] = [
+    "Posted today", "Just posted", "Posted 1 day ago", "Posted 3 days ago", "Posted 30+ days ago",
+    "Active 5 days ago", "vor 3 Tagen", "Gerade veröffentlicht", "il y a 2 jours", "Publiée à l'instant",
+    "hace 5 días", "3 giorni fa", "3 dagen geleden", "há 2 dias"
+]
+
+
+def legacy_date_posted(posted: str, ignore_older_than_days: int) -> str | None:
+    '''The previous implementation, without the error handling.'''
+
+    regex_id: re.Pattern = re.compile("([0-9]+)")
+    today = datetime.now()
+
+    if "today" in posted.lower() or "just" in posted.lower():
+        return today.strftime("%Y-%m-%d")
+
+    matches: list[str] = re.findall(regex_id, posted)
+    if not matches:  # Raised an exception and stopped the application.
+        return None
+    diff = timedelta(hours=int(matches[0]) * 24)
+    if diff.days > ignore_older_than_days:
+        return None
+    return (today - diff).strftime("%Y-%m-%d")
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--postings", type=int, default=100_000, help="Postings to normalize.")
+    parser.add_argument("--cycles", type=int, default=10, help="Scrape cycles the postings are spread over.")
+    args = parser.parse_args()
+
+    postings: list[str] = random.Random(1).choices(POSTED_STRINGS, k=args.postings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path: Path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps({"db_path": "", "log_path": ""}))
+        config = Config(config_path)
+
+    start: float = time.perf_counter()
+    for posted in postings:
+        legacy_date_posted(posted, config.ignore_older_than_days)
+    legacy_sec: float = time.perf_counter() - start
+
+    normalizer = PostingNormalizer(config)
+    per_cycle: int = max(len(postings) // max(args.cycles, 1), 1)
+    start = time.perf_counter()
+    for index, posted in enumerate(postings):
+        if index % per_cycle == 0:
+            normalizer.new_cycle()
+        normalizer.date_posted(posted)
+    normalizer_sec: float = time.perf_counter() - start
+
+    print(f'{"implementation":>16} {"postings/s":>12} {"us/posting":>11}')
+    for name, elapsed in (("legacy", legacy_sec), ("normalizer", normalizer_sec)):
+        print(f'{name:>16} {len(postings) / elapsed:>12.0f} {elapsed / len(postings) * 1e6:>11.2f}')
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,176 @@
+'''Offline benchmark of the scrape pipeline: URL construction -> page fetch -> extraction -> database insert.
+
+Pages are served by `ReplayDriver`, or by a local `ReplayServer` with `--backend http`, from a recorded corpus
+(`--corpus`, recorded with `record_dir`) or from a synthetic one, against databases pre-filled with synthetic rows.
+Each database size runs in its own process, so that the reported peak RSS belongs to that run only.
+
+Usage (from the main directory):
+
+    python -m benchmarks.bench_scrape --sizes 1000 100000 1000000
+'''
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+from pathlib import Path
+import resource
+import sys
+import tempfile
+import time
+
+from indeedjobs import Config, IndeedDb, IndeedScraper
+from indeedjobs.replay import record_page
+
+
+BENCH_CONFIG: dict = {
+    "locations": {"uk": ["London", "Manchester"], "de": ["Berlin"]},
+    "job_titles": ["python developer", "data engineer"],
+    "selenium_sleep_sec": 1,
+    "domain_min_interval_sec": 0,
+    "ignore_older_than_days": 7
+}
+
+
+POSTING_TEMPLATE: str = '''<div class="job_seen_beacon">
+<a class="jcs-JobTitle" href="/rc/clk?jk={job_key}&amp;from=serp"><span>{title}</span></a>
+<span data-testid="company-name">{employer}</span>
+<span data-testid="myJobsStateDate"><span>Posted</span> {days} days ago</span>
+<ul><li>Work with Python and SQL on {title}.</li><li>Hybrid working, {employer} office.</li></ul>
+</div>'''
+
+
+def synthetic_page(url: str, page: int, pages: int, postings: int) -> str:
+    '''Returns a results page resembling `Indeed`'s, with `postings` postings and a next page link unless last.'''
+
+    cards: list[str] = []
+    for index in range(postings):
+        job_key: str = hashlib.md5(f'{url}|{page}|{index}'.encode()).hexdigest()[:16]
+        cards.append(POSTING_TEMPLATE.format(job_key=job_key, title=f'Developer {page}-{index}',
+                                             employer=f'Employer {index % 7}', days=index % 5))
+
+    next_link: str = ""
+    if page < pages:
+        next_link = f'<a data-testid="pagination-page-next" href="{url}&amp;start={page * postings}">Next</a>'
+    return f'<html><body>{"".join(cards)}{next_link}</body></html>'
+
+
+def build_corpus(corpus_dir: Path, config: Config, pages: int, postings: int) -> None:
+    '''Records a synthetic corpus for every URL the scraper constructs from `config`.'''
+
+    scraper = IndeedScraper(config, IndeedDb(config))
+    for url in scraper._construct_urls():
+        page_url: str = url
+        for page in range(1, pages + 1):
+            record_page(corpus_dir, page_url, synthetic_page(url, page, pages, postings))
+            page_url = f'{url}&start={page * postings}'
+
+
+def fill_db(indeed_db: IndeedDb, rows: int) -> None:
+    '''Pre-fills the database with `rows` synthetic job rows.'''
+
+    indeed_db.create_table(drop_existing=True)
+    con, cur = indeed_db.get_con_cur()
+    batch: int = 50_000
+    for start in range(0, rows, batch):
+        cur.executemany('''INSERT INTO indeed_jobs(
+                        job_key, url, job_title, employer, description, date_posted, notified, interested, applied, response, rejected, interviews, job_offer
+                        ) VALUES (?,?,?,?,?,?,1,0,0,0,0,0,0)''',
+                        ((f'db{i}', f'https://uk.indeed.com/rc/clk?jk=db{i}&from=serp', f'Title {i}', f'Employer {i % 1000}',
+                          "Synthetic description.", "2024-01-01") for i in range(start, min(start + batch, rows))))
+        con.commit()
+    cur.close()
+
+
+def run(rows: int, corpus_dir: str, workers: int, extraction_mode: str, backend: str) -> dict:
+    '''Runs a single scrape cycle against a database of `rows` rows and returns the measurements.'''
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path: Path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps({**BENCH_CONFIG, "db_path": str(Path(tmp) / "bench.db"), "log_path": "",
+                                           "replay_dir": corpus_dir, "scraper_workers": workers,
+                                           "extraction_mode": extraction_mode, "fetch_backend": backend}))
+        config = Config(config_path)
+        indeed_db = IndeedDb(config)
+        indeed_db.create_adapters_converters()
+        fill_db(indeed_db, rows)
+
+        scraper = IndeedScraper(config, indeed_db)
+        pages: int = 0
+        insert_sec: float = 0
+        inserted: int = 0
+
+        fetch_page = scraper._fetch_page
+        def counting_fetch_page(*args, **kwargs):
+            nonlocal pages
+            pages += 1
+            return fetch_page(*args, **kwargs)
+        scraper._fetch_page = counting_fetch_page
+
+        fetch_page_http = scraper._fetch_page_http
+        def counting_fetch_page_http(*args, **kwargs):
+            nonlocal pages
+            pages += 1
+            return fetch_page_http(*args, **kwargs)
+        scraper._fetch_page_http = counting_fetch_page_http
+
+        insert_jobs = indeed_db.insert_jobs
+        def timed_insert_jobs(*args, **kwargs):
+            nonlocal insert_sec, inserted
+            start: float = time.perf_counter()
+            job_ids: list[int] = insert_jobs(*args, **kwargs)
+            insert_sec += time.perf_counter() - start
+            inserted += len(job_ids)
+            return job_ids
+        indeed_db.insert_jobs = timed_insert_jobs
+
+        start = time.perf_counter()
+        scraper._scrape(scraper._construct_urls())
+        elapsed: float = time.perf_counter() - start
+        scraper.close()
+
+    peak_rss_kb: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # Reported in bytes.
+        peak_rss_kb //= 1024
+
+    return {
+        "rows": rows,
+        "pages_per_sec": pages / elapsed,
+        "postings_per_sec": inserted / elapsed,
+        "inserts_per_sec": inserted / insert_sec if insert_sec else 0.0,
+        "peak_rss_mb": peak_rss_kb / 1024
+    }
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="Synthetic database sizes in rows.")
+    parser.add_argument("--corpus", type=str, default="", help="Recorded corpus directory. Synthetic if omitted.")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per query in the synthetic corpus.")
+    parser.add_argument("--postings", type=int, default=15, help="Postings per page in the synthetic corpus.")
+    parser.add_argument("--workers", type=int, default=1, help="Scraper workers.")
+    parser.add_argument("--extraction-mode", type=str, default="html", choices=["script", "html"])
+    parser.add_argument("--backend", type=str, default="selenium", choices=["selenium", "http"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir: str = args.corpus
+        if not corpus_dir:
+            corpus_dir = str(Path(tmp) / "corpus")
+            config_path: Path = Path(tmp) / "config.json"
+            config_path.write_text(json.dumps({**BENCH_CONFIG, "db_path": str(Path(tmp) / "unused.db"), "log_path": ""}))
+            build_corpus(Path(corpus_dir), Config(config_path), args.pages, args.postings)
+
+        print(f'{"rows":>10} {"pages/s":>10} {"postings/s":>11} {"inserts/s":>10} {"peak RSS MB":>12}')
+        for rows in args.sizes:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result: dict = executor.submit(run, rows, corpus_dir, args.workers, args.extraction_mode, args.backend).result()
+            print(f'{result["rows"]:>10} {result["pages_per_sec"]:>10.1f} {result["postings_per_sec"]:>11.1f} '
+                  f'{result["inserts_per_sec"]:>10.1f} {result["peak_rss_mb"]:>12.1f}')
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,108 @@
+'''Offline check that a scraper process of the sharded mode can be killed and restarted without losing postings.
+
+Runs the sharded mode against a synthetic corpus served by `ReplayDriver`, kills a scraper process with `SIGKILL`
+once part of the postings were committed, and waits for the supervisor to restart it. Passes if every posting of
+the corpus ends up in the database exactly once.
+
+Usage (from the main directory):
+
+    python -m benchmarks.check_shard_restart --shards 2
+'''
+import argparse
+import json
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import time
+
+from indeedjobs import Config, IndeedDb, IndeedScraper
+from indeedjobs.parser import parse_results_page
+from indeedjobs.sharding import SHARD_RESTART_DELAY_SEC, ShardSupervisor
+from benchmarks.bench_scrape import BENCH_CONFIG, build_corpus
+
+
+def corpus_job_keys(corpus_dir: Path) -> set[str]:
+    '''Returns the job keys of every posting in the recorded corpus.'''
+
+    job_keys: set[str] = set()
+    for page_file in corpus_dir.iterdir():
+        page: dict = parse_results_page(page_file.read_text(encoding="utf-8"), "https://uk.indeed.com/jobs")
+        job_keys.update(posting["job_key"] for posting in page["postings"])
+    return job_keys
+
+
+def count_jobs(indeed_db: IndeedDb) -> tuple[int, int]:
+    '''Returns the number of job rows and of distinct job keys in the database.'''
+
+    con, cur = indeed_db.get_con_cur()
+    try:
+        return cur.execute('SELECT COUNT(*), COUNT(DISTINCT job_key) FROM indeed_jobs').fetchone()
+    finally:
+        cur.close()
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=2, help="Scraper processes.")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per query in the synthetic corpus.")
+    parser.add_argument("--postings", type=int, default=15, help="Postings per page in the synthetic corpus.")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for every posting.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir: Path = Path(tmp) / "corpus"
+        config_path: Path = Path(tmp) / "config.json"
+        log_path: Path = Path(tmp) / "check.log"
+        config_path.write_text(json.dumps({**BENCH_CONFIG, "db_path": str(Path(tmp) / "check.db"), "log_path": str(log_path),
+                                           "replay_dir": str(corpus_dir), "extraction_mode": "html",
+                                           "shards": args.shards, "shard_by": "hash",
+                                           # Spaced out, so that the process is killed in the middle of its searches.
+                                           "domain_min_interval_sec": 0.5}))
+        config = Config(config_path)
+        build_corpus(corpus_dir, config, args.pages, args.postings)
+        expected: set[str] = corpus_job_keys(corpus_dir)
+
+        indeed_db = IndeedDb(config)
+        indeed_db.create_adapters_converters()
+        indeed_db.create_table()
+        supervisor = ShardSupervisor(config, config_path, log_path, indeed_db, IndeedScraper(config, indeed_db))
+        supervisor_thread = threading.Thread(target=supervisor.run)
+        supervisor_thread.start()
+
+        killed_at: int | None = None
+        deadline: float = time.monotonic() + args.timeout
+        rows, distinct = 0, 0
+        try:
+            while time.monotonic() < deadline:
+                rows, distinct = count_jobs(indeed_db)
+                if killed_at is None and rows > 0:
+                    killed_at = rows
+                    supervisor.processes[0].kill()
+                    print(f'Killed scraper process 0 with {rows} of {len(expected)} postings stored, '
+                          f'restarting in {SHARD_RESTART_DELAY_SEC:.0f}s.')
+                if killed_at is not None and distinct >= len(expected):
+                    break
+                time.sleep(0.2)
+        finally:
+            config.kill = True
+            supervisor_thread.join()
+
+        rows, distinct = count_jobs(indeed_db)
+        con, cur = indeed_db.get_con_cur()
+        stored: set[str] = {job_key for (job_key,) in cur.execute('SELECT job_key FROM indeed_jobs')}
+        cur.close()
+        indeed_db.close()
+
+    missing: set[str] = expected - stored
+    print(f'{len(expected)} postings in the corpus, {rows} rows stored, {distinct} distinct, {len(missing)} missing.')
+    if killed_at is None or missing or rows != distinct:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,187 @@
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Callable
+from urllib.parse import quote
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.firefox.options import Options
+
+from .configuration import Config
+from .replay import ReplayDriver
+
+
+USER_AGENT: str = "userAgent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0"
+
+# Sessions idle for longer than this are checked to still respond before being reused.
+HEALTH_CHECK_IDLE_SEC: float = 30
+
+# Proxy auto-config sending requests to blocked hosts (and their subdomains) to a closed local port.
+BLOCKING_PAC_TEMPLATE: str = '''function FindProxyForURL(url, host) {{
+    var blocked = {hosts};
+    for (var i = 0; i < blocked.length; i++) {{
+        if (host == blocked[i] || dnsDomainIs(host, "." + blocked[i])) return "PROXY 127.0.0.1:9";
+    }}
+    return "DIRECT";
+}}'''
+
+
+def firefox_options(config: Config) -> Options:
+    '''Returns the `Firefox` options of the scraper. With `block_resources`, images, web fonts, media autoplay
+    and known trackers are not loaded, and the hosts in `blocked_hosts` are unreachable.
+    '''
+
+    options = Options()
+    options.add_argument("--headless")
+    options.set_preference("general.useragent.override", USER_AGENT)
+    # Return from `get` once the document is parsed, the scraper waits for the results itself.
+    options.page_load_strategy = "eager"
+
+    if config.block_resources:
+        options.set_preference("permissions.default.image", 2)
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+        options.set_preference("browser.display.use_document_fonts", 0)
+        options.set_preference("media.autoplay.default", 5)
+        options.set_preference("media.autoplay.blocking_policy", 2)
+        options.set_preference("privacy.trackingprotection.enabled", True)
+        options.set_preference("privacy.trackingprotection.socialtracking.enabled", True)
+        options.set_preference("privacy.trackingprotection.cryptomining.enabled", True)
+        options.set_preference("privacy.trackingprotection.fingerprinting.enabled", True)
+
+        if config.blocked_hosts:
+            pac: str = BLOCKING_PAC_TEMPLATE.format(hosts=json.dumps(config.blocked_hosts))
+            options.set_preference("network.proxy.type", 2)
+            options.set_preference("network.proxy.autoconfig_url", f'data:application/x-ns-proxy-autoconfig,{quote(pac)}')
+            # Otherwise `Firefox` connects directly once the closed port fails, and the blocked hosts load anyway.
+            options.set_preference("network.proxy.failover_direct", False)
+
+    return options
+
+
+def _process_tree_rss_mb(pid: int) -> float | None:
+    '''Returns the resident memory in MB of process `pid` and its descendants, or `None` where `/proc` is not available.'''
+
+    total_kb: int = 0
+    pending: list[int] = [pid]
+    try:
+        while pending:
+            current: int = pending.pop()
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+                    break
+            for task in Path(f'/proc/{current}/task').iterdir():
+                children: str = (task / "children").read_text()
+                pending.extend(int(child) for child in children.split())
+    except (OSError, ValueError):
+        if total_kb == 0:
+            return None
+    return total_kb / 1024
+
+
+class DriverSession:
+
+    def __init__(self, driver: webdriver.Firefox | ReplayDriver) -> None:
+        '''A `webdriver` kept open across pages and scrape cycles, with its usage.'''
+
+        self.driver: webdriver.Firefox | ReplayDriver = driver
+        self.pages: int = 0
+        self.last_used: float = time.monotonic()
+
+
+    def memory_mb(self) -> float | None:
+        '''Returns the memory used by the browser processes in MB, if it can be measured.'''
+
+        pid: int | None = getattr(self.driver, "capabilities", {}).get("moz:processID")
+        if pid is None:
+            return None
+        return _process_tree_rss_mb(pid)
+
+
+    def healthy(self) -> bool:
+        '''Whether the browser still responds.'''
+
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+
+    def __init__(self, config: Config, create_driver: Callable[[], webdriver.Firefox | ReplayDriver]) -> None:
+        '''Thread-safe pool of `webdriver` sessions reused by the scraper workers across scrape cycles, saving the
+        startup of `Firefox` for every cycle. A session is replaced after `driver_max_pages` pages, once its browser
+        uses more than `driver_max_memory_mb` MB, after an error, or if it stopped responding while idle.
+        '''
+
+        self.config: Config = config
+        self.create_driver: Callable[[], webdriver.Firefox | ReplayDriver] = create_driver
+        self.lock: threading.Lock = threading.Lock()
+        self.idle: list[DriverSession] = []
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def acquire(self) -> DriverSession:
+        '''Returns an idle session, or starts a new one.'''
+
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                session: DriverSession = self.idle.pop()
+
+            if time.monotonic() - session.last_used < HEALTH_CHECK_IDLE_SEC or session.healthy():
+                return session
+            self.logger.warning("Browser session stopped responding, replacing it.")
+            session.quit()
+
+        return DriverSession(self.create_driver())
+
+
+    def _expired(self, session: DriverSession) -> bool:
+        '''Whether `session` has reached its page or memory limit.'''
+
+        if self.config.driver_max_pages > 0 and session.pages >= self.config.driver_max_pages:
+            self.logger.info(f'Recycling browser session after {session.pages} pages.')
+            return True
+
+        if self.config.driver_max_memory_mb > 0:
+            memory_mb: float | None = session.memory_mb()
+            if memory_mb is not None and memory_mb > self.config.driver_max_memory_mb:
+                self.logger.info(f'Recycling browser session using {memory_mb:.0f} MB.')
+                return True
+        return False
+
+
+    def release(self, session: DriverSession, broken: bool = False) -> None:
+        '''Returns `session` to the pool after a page, or closes it if it is broken or expired.'''
+
+        session.pages += 1
+        session.last_used = time.monotonic()
+        if broken or self._expired(session):
+            session.quit()
+            return
+
+        with self.lock:
+            self.idle.append(session)
+
+
+    def close(self) -> None:
+        '''Closes every idle session.'''
+
+        with self.lock:
+            sessions, self.idle = self.idle, []
+        for session in sessions:
+            session.quit()
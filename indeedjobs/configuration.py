@@ -14,12 +14,50 @@ class Config():
         self.log_path: str
         self.selenium_sleep_sec: int = 10
         self.scraper_delay_sec: int = 3600
+        self.query_min_interval_sec: int = 600
+        self.query_max_interval_sec: int = 14400
+        self.query_retry_sec: int = 60
         self.bot_delay_sec: int = 600
         self.ignore_older_than_days: int = 7
+        self.scraper_workers: int = 1
+        self.driver_max_pages: int = 200
+        self.driver_max_memory_mb: int = 1500
+        self.block_resources: bool = True
+        self.blocked_hosts: list[str] = ["google-analytics.com", "googletagmanager.com", "doubleclick.net",
+                                         "googlesyndication.com", "facebook.net", "hotjar.com", "bing.com"]
+        self.domain_min_interval_sec: float = 2
+        self.domain_max_interval_sec: float = 120
+        self.extraction_mode: str = "script"
+        self.fetch_backend: str = "selenium"
+        self.parser_processes: int = 0
+        self.record_dir: str = ""
+        self.replay_dir: str = ""
+        self.incremental_pagination: bool = True
+        self.dedup_enabled: bool = True
+        self.dedup_threshold: float = 0.8
+        self.dedup_window_days: int = 30
+        self.enrichment_enabled: bool = False
+        self.enrichment_workers: int = 1
+        self.enrichment_queue_size: int = 1000
+        self.enrichment_interval_sec: float = 5
+        self.planner_min_yield: float = 0.02
+        self.planner_warmup_cycles: int = 3
+        self.planner_throttle_every: int = 4
+        self.db_batch_size: int = 100
+        self.db_flush_ms: int = 1000
+        self.notification_mode: str = "message"
+        self.notification_digest_size: int = 10
+        self.notification_concurrency: int = 2
+        self.metrics_port: int = 0
+        self.metrics_json_path: str = ""
+        self.metrics_dump_sec: int = 60
+        self.shards: int = 0
+        self.shard_by: str = "country"
+        self.shard_port: int = 0
 
         try:
             with open(config_path, 'r') as f:
-                self.__dict__ = json.load(f)
+                self.__dict__.update(json.load(f))
         except (FileNotFoundError, json.decoder.JSONDecodeError) as e:
             print("Configuration file not found or corrupted. Please check the template in order to create one.")
             raise e
@@ -1,9 +1,94 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+import hashlib
 import logging
 from pathlib import Path
 import sqlite3
+import threading
+import time
+from typing import Any, Callable
+import zlib
 
 from .configuration import Config
+from .dedup import LSH_BANDS, lsh_buckets, pack_signature, posting_key, posting_signature, similarity, unpack_signature
+from .metrics import TimedLock, metrics
+from .utils import get_job_key
+
+
+# Applied to every new connection. WAL lets the bot read while the scraper writes.
+CONNECTION_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000"
+)
+
+INSERT_JOB_SQL: str = '''INSERT INTO indeed_jobs(
+    job_key, url, job_title, employer, description, date_posted, notified, interested, applied, response, rejected, interviews, job_offer
+    ) VALUES (?,?,?,?,?,?,0,0,0,0,0,0,0)
+    ON CONFLICT(job_key) DO NOTHING'''
+
+# Fixed, parameterized statements for every status change, keyed on `(field, operation)`. Each updates a 
+# single row in one statement and returns the new value, so they are compiled once and cached by `sqlite3`.
+UPDATE_STATEMENTS: dict[tuple[str, str], str] = {
+    ("interested", "+"): 'UPDATE indeed_jobs SET interested = 1 WHERE id = ? RETURNING interested',
+    ("interested", "-"): 'UPDATE indeed_jobs SET interested = 0 WHERE id = ? RETURNING interested',
+    ("interviews", "+"): 'UPDATE indeed_jobs SET interviews = interviews + 1 WHERE id = ? RETURNING interviews',
+    ("interviews", "-"): 'UPDATE indeed_jobs SET interviews = MAX(interviews - 1, 0) WHERE id = ? RETURNING interviews',
+    ("interviews", ""): 'SELECT interviews FROM indeed_jobs WHERE id = ?',
+    ("applied", ""): 'UPDATE indeed_jobs SET applied = NOT applied WHERE id = ? RETURNING applied',
+    ("response", ""): 'UPDATE indeed_jobs SET response = NOT response WHERE id = ? RETURNING response',
+    ("rejected", ""): 'UPDATE indeed_jobs SET rejected = NOT rejected WHERE id = ? RETURNING rejected',
+    ("job_offer", ""): 'UPDATE indeed_jobs SET job_offer = NOT job_offer WHERE id = ? RETURNING job_offer'
+}
+
+
+# Full-text index over the searchable columns of `indeed_jobs`, reading their content from the table itself.
+# The triggers keep it in sync with every insert, update and delete, whichever code path makes them.
+FTS_STATEMENTS: tuple[str, ...] = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS indeed_jobs_fts USING fts5(
+        job_title, employer, description, content='indeed_jobs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )''',
+    '''CREATE TRIGGER IF NOT EXISTS indeed_jobs_fts_insert AFTER INSERT ON indeed_jobs BEGIN
+        INSERT INTO indeed_jobs_fts(rowid, job_title, employer, description) VALUES (new.id, new.job_title, new.employer, new.description);
+        END''',
+    '''CREATE TRIGGER IF NOT EXISTS indeed_jobs_fts_delete AFTER DELETE ON indeed_jobs BEGIN
+        INSERT INTO indeed_jobs_fts(indeed_jobs_fts, rowid, job_title, employer, description) 
+        VALUES ('delete', old.id, old.job_title, old.employer, old.description);
+        END''',
+    '''CREATE TRIGGER IF NOT EXISTS indeed_jobs_fts_update AFTER UPDATE OF job_title, employer, description ON indeed_jobs BEGIN
+        INSERT INTO indeed_jobs_fts(indeed_jobs_fts, rowid, job_title, employer, description) 
+        VALUES ('delete', old.id, old.job_title, old.employer, old.description);
+        INSERT INTO indeed_jobs_fts(rowid, job_title, employer, description) VALUES (new.id, new.job_title, new.employer, new.description);
+        END'''
+)
+
+# Most recent postings sharing an LSH bucket with a new posting that are compared with it.
+MAX_DUPLICATE_CANDIDATES: int = 100
+
+# Ranks matches in the title above the employer, and the employer above the description.
+SEARCH_JOBS_SQL: str = '''SELECT j.id, j.url, j.job_title, j.employer, snippet(indeed_jobs_fts, 2, '**', '**', '...', 16)
+    FROM indeed_jobs_fts JOIN indeed_jobs j ON j.id = indeed_jobs_fts.rowid
+    WHERE indeed_jobs_fts MATCH ?
+    ORDER BY bm25(indeed_jobs_fts, 10.0, 5.0, 1.0)
+    LIMIT ?'''
+
+
+def _update_statement(field: str, value: str) -> str:
+    '''Returns the statement for changing `field` according to the operation `value`.'''
+
+    if field == "interested":
+        return UPDATE_STATEMENTS[(field, "+" if value == "+" else "-")]
+    if field == "interviews":
+        return UPDATE_STATEMENTS[(field, value if value in ("+", "-") else "")]
+    try:
+        return UPDATE_STATEMENTS[(field, "")]
+    except KeyError:
+        raise ValueError(f'Unknown field: {field}') from None
+
 
 class IndeedDb:
 
@@ -18,20 +103,86 @@ class IndeedDb:
             self.db_path = Path.cwd() / "indeed.db"
 
         self.logger: logging.Logger = logging.getLogger(__name__)
-        self.busy = False
-        self.new_jobs = False
+        self.new_jobs_listeners: list[Callable[[list[int]], None]] = []
+
+        # Each thread keeps its own long-lived connection. Writes are serialized across threads with `write_lock`,
+        # while reads never wait thanks to WAL journaling.
+        self.write_lock: TimedLock = TimedLock("db_lock_wait")
+        self._local: threading.local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock: threading.Lock = threading.Lock()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        '''Opens a new connection to the database with the tuned pragmas applied.'''
+
+        con: sqlite3.Connection = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES, 
+                                                  timeout=10, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            con.execute(pragma)
+
+        with self._connections_lock:
+            self._connections.append(con)
+        return con
 
 
     def get_con_cur(self) -> tuple[sqlite3.Connection, sqlite3.Cursor]|tuple[None, None]:
-        '''Creates and returns the `Connection` and `Cursor` objects for the `sqlite` database'''
+        '''Returns the calling thread's `Connection`, opening it on first use, and a new `Cursor` for it.
+        The connection is reused for the lifetime of the thread, so callers should only close the cursor.
+        '''
 
         try:
-            con: sqlite3.Connection = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            con: sqlite3.Connection | None = getattr(self._local, "con", None)
+            if con is None:
+                con = self._connect()
+                self._local.con = con
             cur: sqlite3.Cursor = con.cursor()
             return con, cur
         except Exception as e:
             self.logger.error(e)
             self.config.kill = True
+            return None, None
+
+
+    def add_new_jobs_listener(self, listener: Callable[[list[int]], None]) -> None:
+        '''Registers `listener` to be called with the Ids of newly inserted jobs, from the inserting thread.'''
+
+        self.new_jobs_listeners.append(listener)
+
+
+    def publish_new_jobs(self, job_ids: list[int]) -> None:
+        '''Passes the Ids of newly inserted jobs to every registered listener.'''
+
+        if not job_ids:
+            return
+        for listener in self.new_jobs_listeners:
+            try:
+                listener(job_ids)
+            except Exception as e:
+                self.logger.exception(e)
+
+
+    def close_thread_connection(self) -> None:
+        '''Closes the calling thread's connection, if it opened one. Call from threads ending before the application.'''
+
+        con: sqlite3.Connection | None = getattr(self._local, "con", None)
+        if con is None:
+            return
+        with self._connections_lock:
+            if con in self._connections:
+                self._connections.remove(con)
+        con.close()
+        self._local.con = None
+
+
+    def close(self) -> None:
+        '''Closes all connections. Call once every thread using the database has stopped.'''
+
+        with self._connections_lock:
+            for con in self._connections:
+                con.close()
+            self._connections = []
+        self._local = threading.local()
 
 
     def create_adapters_converters(self) -> None:
@@ -45,79 +196,590 @@ class IndeedDb:
         '''Initial creation of the `indeed_jobs` table.'''
         
         con, cur = self.get_con_cur()
-        if drop_existing:
-            cur.execute("DROP TABLE IF EXISTS indeed_jobs")
-
-        try:
-            cur.execute('''CREATE TABLE IF NOT EXISTS indeed_jobs(
-                        id INTEGER PRIMARY KEY,
-                        url TEXT,
-                        job_title TEXT,
-                        employer TEXT,
-                        description TEXT,
-                        date_posted TEXT,
-                        notified BOOLEAN,
-                        interested BOOLEAN,
-                        applied BOOLEAN,
-                        response BOOLEAN,
-                        rejected BOOLEAN,
-                        interviews INTEGER,
-                        job_offer BOOLEAN
-                        )''')
-        except Exception as e:
-            self.logger.error(e)
-            self.config.kill = True
+
+        with self.write_lock:
+            if drop_existing:
+                cur.execute("DROP TABLE IF EXISTS indeed_jobs_fts")
+                cur.execute("DROP TABLE IF EXISTS indeed_jobs")
+                cur.execute("DROP TABLE IF EXISTS query_state")
+                cur.execute("DROP TABLE IF EXISTS query_stats")
+                cur.execute("DROP TABLE IF EXISTS job_descriptions")
+                cur.execute("DROP TABLE IF EXISTS job_lsh")
+
+            try:
+                cur.execute('''CREATE TABLE IF NOT EXISTS indeed_jobs(
+                            id INTEGER PRIMARY KEY,
+                            job_key TEXT,
+                            url TEXT,
+                            job_title TEXT,
+                            employer TEXT,
+                            description TEXT,
+                            date_posted TEXT,
+                            notified BOOLEAN,
+                            interested BOOLEAN,
+                            applied BOOLEAN,
+                            response BOOLEAN,
+                            rejected BOOLEAN,
+                            interviews INTEGER,
+                            job_offer BOOLEAN,
+                            discord_message_id INTEGER,
+                            description_hash TEXT,
+                            salary TEXT,
+                            minhash BLOB,
+                            duplicate_of INTEGER
+                            )''')
+                self._migrate_job_key(cur)
+                self._add_column(cur, "discord_message_id", "INTEGER")
+                self._add_column(cur, "description_hash", "TEXT")
+                self._add_column(cur, "salary", "TEXT")
+                self._add_column(cur, "minhash", "BLOB")
+                self._add_column(cur, "duplicate_of", "INTEGER")
+                cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_indeed_jobs_job_key ON indeed_jobs(job_key)')
+                cur.execute('CREATE INDEX IF NOT EXISTS idx_indeed_jobs_discord_message_id ON indeed_jobs(discord_message_id)')
+                cur.execute('CREATE INDEX IF NOT EXISTS idx_indeed_jobs_unnotified ON indeed_jobs(id) WHERE notified = 0')
+                self._create_fts(cur)
+                cur.execute('''CREATE TABLE IF NOT EXISTS query_state(
+                            query TEXT PRIMARY KEY,
+                            newest_job_key TEXT,
+                            newest_date_posted TEXT,
+                            updated TEXT,
+                            completed BOOLEAN DEFAULT 1
+                            )''')
+                cur.execute('''CREATE TABLE IF NOT EXISTS query_stats(
+                            query TEXT PRIMARY KEY,
+                            cycles INTEGER,
+                            found INTEGER,
+                            new INTEGER,
+                            yield_ema REAL,
+                            skipped INTEGER,
+                            last_run TEXT
+                            )''')
+                cur.execute('''CREATE TABLE IF NOT EXISTS job_lsh(
+                            bucket INTEGER,
+                            job_id INTEGER,
+                            date_posted TEXT,
+                            PRIMARY KEY (bucket, job_id)
+                            ) WITHOUT ROWID''')
+                cur.execute('CREATE INDEX IF NOT EXISTS idx_job_lsh_date_posted ON job_lsh(date_posted)')
+                cur.execute('''CREATE TABLE IF NOT EXISTS job_descriptions(
+                            hash TEXT PRIMARY KEY,
+                            content BLOB
+                            )''')
+                con.commit()
+            except Exception as e:
+                self.logger.error(e)
+                self.config.kill = True
+            finally:
+                cur.close()
+
+
+    def _add_column(self, cur: sqlite3.Cursor, column: str, declaration: str, table: str = "indeed_jobs") -> bool:
+        '''Adds `column` to `table` if created before it existed. Returns whether it was added.'''
+
+        columns: list[str] = [row[1] for row in cur.execute(f'PRAGMA table_info({table})').fetchall()]
+        if column in columns:
+            return False
+
+        self.logger.info(f'Migrating database: adding `{column}` column to `{table}`.')
+        cur.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+        return True
+
+
+    def _create_fts(self, cur: sqlite3.Cursor) -> None:
+        '''Creates the full-text index and its triggers, and indexes the existing rows if it did not exist.'''
+
+        exists: bool = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'indeed_jobs_fts'").fetchone() is not None
+        for statement in FTS_STATEMENTS:
+            cur.execute(statement)
+
+        if not exists:
+            self.logger.info("Migrating database: building the full-text search index.")
+            cur.execute("INSERT INTO indeed_jobs_fts(indeed_jobs_fts) VALUES('rebuild')")
+
+
+    def _migrate_job_key(self, cur: sqlite3.Cursor) -> None:
+        '''Adds the `job_key` column to tables created before it existed and fills it in from the stored URLs.
+        Runs on every start while rows with a job key in their URL have none, so an interrupted migration is resumed.
+        Rows sharing a job key (duplicates from older versions) keep the key only on the first row, the others get
+        `dup:{id}`, and rows whose URL has no valid key get `nokey:{id}`, so that they are not visited again. 
+        Real job keys are alphanumeric, so these never collide with them.
+        '''
+
+        self._add_column(cur, "job_key", "TEXT")
+
+        rows: list[tuple[int, str]] = cur.execute('''SELECT id, url FROM indeed_jobs 
+                                                  WHERE job_key IS NULL AND url LIKE '%jk=%' ORDER BY id''').fetchall()
+        if not rows:
+            return
+
+        self.logger.info("Migrating database: filling in missing job keys.")
+        seen: set[str] = {job_key for (job_key,) in cur.execute('SELECT job_key FROM indeed_jobs WHERE job_key IS NOT NULL')}
+        updates: list[tuple[str, int]] = []
+        for row_id, url in rows:
+            job_key: str | None = get_job_key(url or "")
+            if job_key is None:
+                job_key = f'nokey:{row_id}'
+            elif job_key in seen:
+                job_key = f'dup:{row_id}'
+            seen.add(job_key)
+            updates.append((job_key, row_id))
+
+        cur.executemany('UPDATE indeed_jobs SET job_key = ? WHERE id = ?', updates)
+        cur.connection.commit()  # Independently of the later migration steps.
+
+
+    def get_job_keys(self, cur: sqlite3.Cursor) -> set[str]:
+        '''Returns the set of all job keys currently in the database.'''
+
+        return {job_key for (job_key,) in cur.execute('SELECT job_key FROM indeed_jobs WHERE job_key IS NOT NULL')}
+
+
+    def get_query_states(self) -> dict[str, tuple[str | None, str | None, bool]]:
+        '''Returns the high-water mark `(newest_job_key, newest_date_posted)` of the last completed scrape of every
+        search query, and whether the pagination of its latest scrape was completed.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            return {query: (job_key, date_posted, bool(completed)) for query, job_key, date_posted, completed
+                    in cur.execute('SELECT query, newest_job_key, newest_date_posted, completed FROM query_state')}
+        finally:
+            cur.close()
+
+
+    def start_queries(self, queries: list[str]) -> None:
+        '''Marks the pagination of `queries` as not completed before they are scraped, keeping their high-water mark,
+        so that a scrape interrupted after committing some of their pages is resumed past them.
+        '''
+
+        if not queries:
+            return
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.executemany('''INSERT INTO query_state(query, completed, updated) VALUES (?, 0, datetime('now'))
+                                ON CONFLICT(query) DO UPDATE SET completed = 0, updated = excluded.updated''',
+                                [(query,) for query in queries])
+                con.commit()
+        finally:
+            cur.close()
+
+
+    def update_query_states(self, newest: dict[str, tuple[str, str | None]]) -> None:
+        '''Stores the newest `(job_key, date_posted)` seen for each search query whose pagination was completed. 
+        The previous date is kept if the newest posting was not added this time.
+        '''
+
+        if not newest:
+            return
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.executemany('''INSERT INTO query_state(query, newest_job_key, newest_date_posted, updated, completed) 
+                                VALUES (?, ?, ?, datetime('now'), 1)
+                                ON CONFLICT(query) DO UPDATE SET 
+                                    newest_job_key = excluded.newest_job_key,
+                                    newest_date_posted = COALESCE(excluded.newest_date_posted, newest_date_posted),
+                                    updated = excluded.updated,
+                                    completed = 1''', 
+                                [(query, job_key, date_posted) for query, (job_key, date_posted) in newest.items()])
+                con.commit()
+        finally:
+            cur.close()
+
+
+    def get_query_stats(self) -> dict[str, tuple[int, float, int]]:
+        '''Returns `(cycles, yield_ema, skipped)` for every search query with statistics.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            return {query: (cycles, yield_ema, skipped) for query, cycles, yield_ema, skipped 
+                    in cur.execute('SELECT query, cycles, yield_ema, skipped FROM query_stats')}
+        finally:
+            cur.close()
+
+
+    def update_query_stats(self, results: dict[str, tuple[int, int]], alpha: float) -> None:
+        '''Adds the `(found, new)` posting counts of a cycle to the statistics of each query, and updates the
+        moving average of the share of new postings with weight `alpha` for this cycle.
+        '''
+
+        if not results:
+            return
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.executemany('''INSERT INTO query_stats(query, cycles, found, new, yield_ema, skipped, last_run) 
+                                VALUES (:query, 1, :found, :new, :yield, 0, datetime('now'))
+                                ON CONFLICT(query) DO UPDATE SET 
+                                    cycles = cycles + 1,
+                                    found = found + excluded.found,
+                                    new = new + excluded.new,
+                                    yield_ema = (1 - :alpha) * yield_ema + :alpha * excluded.yield_ema,
+                                    skipped = 0,
+                                    last_run = excluded.last_run''', 
+                                [{"query": query, "found": found, "new": new, "yield": new / found if found else 0.0, "alpha": alpha} 
+                                 for query, (found, new) in results.items()])
+                con.commit()
+        finally:
+            cur.close()
+
+
+    def skip_queries(self, queries: list[str]) -> None:
+        '''Counts a skipped cycle for each of `queries`.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.executemany('UPDATE query_stats SET skipped = skipped + 1 WHERE query = ?', [(query,) for query in queries])
+                con.commit()
         finally:
             cur.close()
-            con.close()
 
 
-    def insert_new_job(self, con: sqlite3.Connection, cur: sqlite3.Cursor, job_url: str, job_title: str, 
+    def insert_jobs(self, con: sqlite3.Connection, cur: sqlite3.Cursor, jobs: list[tuple[str, str, str, str, str, str]]) -> list[int]:
+        '''Insert new job rows to the database table in a single transaction. Each job is a tuple of
+        `(job_key, url, job_title, employer, description, date_posted)`. Jobs whose key is already in the table
+        are skipped by the database. Returns the Ids of the rows inserted.
+
+        With `dedup_enabled`, new jobs that are near-duplicates of a recent job are linked to it and not notified,
+        see `_link_duplicates`.
+        '''
+
+        if not jobs:
+            return []
+
+        # Of the rows sharing a job key, only the first is inserted. Descriptions too short to compare are not signed.
+        signatures: dict[str, tuple[str, str, tuple[int, ...]] | None] = {}
+        if self.config.dedup_enabled:
+            with metrics.time("dedup_signature"):
+                for job_key, _, job_title, employer, description, date_posted in jobs:
+                    if job_key not in signatures:
+                        signature: tuple[int, ...] | None = posting_signature(description)
+                        signatures[job_key] = None if signature is None else (posting_key(employer, job_title), date_posted, signature)
+
+        with self.write_lock, metrics.time("db_insert"):
+            try:
+                # New rows get Ids above the current maximum, and no other writer can interleave under the lock.
+                last_id: int = cur.execute('SELECT COALESCE(MAX(id), 0) FROM indeed_jobs').fetchone()[0]
+                cur.executemany(INSERT_JOB_SQL, jobs)
+                new_jobs: list[tuple[int, str]] = cur.execute('SELECT id, job_key FROM indeed_jobs WHERE id > ? ORDER BY id', 
+                                                              (last_id,)).fetchall()
+                job_ids: list[int] = [job_id for job_id, _ in new_jobs]
+                if self.config.dedup_enabled:
+                    self._link_duplicates(cur, [(job_id, *signatures[job_key]) for job_id, job_key in new_jobs 
+                                                if signatures[job_key] is not None])
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+        metrics.inc("postings_inserted", len(job_ids))
+        return job_ids
+
+
+    def _link_duplicates(self, cur: sqlite3.Cursor, new_jobs: list[tuple[int, str, str, tuple[int, ...]]]) -> None:
+        '''Stores the description MinHash signature and LSH buckets of every `(job_id, posting_key, date_posted, signature)` 
+        just inserted, and checks it against the jobs posted in the last `dedup_window_days` days sharing a bucket 
+        with it. Buckets include the posting key, so only jobs with the same employer and title share them. If the 
+        estimated similarity of the descriptions to one of them reaches `dedup_threshold`, the job is linked to the 
+        original posting through `duplicate_of`, marked as notified and logged. Buckets of jobs older than the window
+        are deleted, so the cost does not grow with the size of the table.
+        '''
+
+        cutoff: str = (date.today() - timedelta(days=self.config.dedup_window_days)).strftime("%Y-%m-%d")
+        placeholders: str = ",".join("?" * LSH_BANDS)
+        cur.execute('DELETE FROM job_lsh WHERE date_posted < ?', (cutoff,))
+
+        for job_id, key, date_posted, signature in new_jobs:
+            buckets: list[int] = lsh_buckets(signature, key)
+            candidates: list[tuple[int, bytes, int | None, str, str]] = cur.execute(f'''SELECT j.id, j.minhash, j.duplicate_of, 
+                                                                          j.employer, j.job_title
+                                                                          FROM job_lsh l JOIN indeed_jobs j ON j.id = l.job_id
+                                                                          WHERE l.bucket IN ({placeholders}) AND l.date_posted >= ?
+                                                                          GROUP BY j.id ORDER BY j.id DESC LIMIT ?''',
+                                                                          (*buckets, cutoff, MAX_DUPLICATE_CANDIDATES)).fetchall()
+
+            original: int | None = None
+            best: float = self.config.dedup_threshold
+            for candidate_id, candidate_minhash, candidate_duplicate_of, employer, job_title in candidates:
+                # Guards against bucket hash collisions between different keys.
+                if posting_key(employer or "", job_title or "") != key:
+                    continue
+                score: float = similarity(signature, unpack_signature(candidate_minhash))
+                if score >= best:
+                    original, best = candidate_duplicate_of or candidate_id, score
+
+            if original is None:
+                cur.execute('UPDATE indeed_jobs SET minhash = ? WHERE id = ?', (pack_signature(signature), job_id))
+            else:
+                cur.execute('UPDATE indeed_jobs SET minhash = ?, duplicate_of = ?, notified = 1 WHERE id = ?', 
+                            (pack_signature(signature), original, job_id))
+                metrics.inc("duplicates_linked")
+                self.logger.info(f'Job with Id: {job_id} ({key}) is a repost of job with Id: {original} '
+                                 f'({best:.0%} similar description), not notified.')
+            cur.executemany('INSERT OR IGNORE INTO job_lsh(bucket, job_id, date_posted) VALUES (?, ?, ?)', 
+                            [(bucket, job_id, date_posted) for bucket in buckets])
+
+
+    def insert_new_job(self, con: sqlite3.Connection, cur: sqlite3.Cursor, job_key: str, job_url: str, job_title: str, 
                        job_employer: str, job_description: str, job_date_posted: str) -> None:
         '''Insert new job row to the database table.'''
         
-        values = (job_url,  job_title, job_employer, job_description, job_date_posted, False, False, False, False, False, 0, False)
-        
-        cur.execute('''INSERT INTO indeed_jobs(
-                    url, job_title, employer, description, date_posted, notified, interested, applied, response, rejected, interviews, job_offer
-                    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)''', values)
-        con.commit()
+        self.insert_jobs(con, cur, [(job_key, job_url, job_title, job_employer, job_description, job_date_posted)])
 
 
-    async def update_for_id(self, job_id: int, field: str, value: str = "") -> bool | int:
+    def get_unnotified_jobs(self, job_ids: list[int] | None = None) -> list[tuple[int, str, str, str, str]]:
+        '''Returns `(id, url, job_title, employer, description)` for every job the user has not been notified of,
+        or only for those among `job_ids` if provided.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            if job_ids is None:
+                return cur.execute('SELECT id, url, job_title, employer, description FROM indeed_jobs WHERE notified = 0').fetchall()
+
+            placeholders: str = ",".join("?" * len(job_ids))
+            return cur.execute(f'''SELECT id, url, job_title, employer, description FROM indeed_jobs 
+                               WHERE notified = 0 AND id IN ({placeholders}) ORDER BY id''', job_ids).fetchall()
+        finally:
+            cur.close()
+
+
+    def mark_notified(self, notifications: list[tuple[int, int]]) -> None:
+        '''Sets the `notified` field and records the Discord message Id for the specified `(job_id, message_id)` pairs.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.executemany('UPDATE indeed_jobs SET notified = 1, discord_message_id = ? WHERE id = ?', 
+                                [(message_id, job_id) for job_id, message_id in notifications])
+                con.commit()
+        finally:
+            cur.close()
+
+
+    def get_job_id_for_message(self, message_id: int) -> int | None:
+        '''Returns the Id of the job notified in the Discord message `message_id`, 
+        or `None` if there is none or the message is a digest of several jobs.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            rows: list[tuple[int]] = cur.execute('SELECT id FROM indeed_jobs WHERE discord_message_id = ? LIMIT 2', (message_id,)).fetchall()
+        finally:
+            cur.close()
+        return rows[0][0] if len(rows) == 1 else None
+
+
+    def search_jobs(self, terms: str, limit: int = 10) -> list[tuple[int, str, str, str, str]]:
+        '''Returns `(id, url, job_title, employer, snippet)` for the jobs best matching the full-text query `terms`, 
+        best first. `terms` may use the `FTS5` query syntax (`OR`, `NOT`, `"phrases"`, `prefix*`); if it is not a 
+        valid query, its words are searched for literally instead.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            try:
+                return cur.execute(SEARCH_JOBS_SQL, (terms, limit)).fetchall()
+            except sqlite3.OperationalError:
+                literal: str = " ".join('"{}"'.format(word.replace('"', '""')) for word in terms.split())
+                return cur.execute(SEARCH_JOBS_SQL, (literal, limit)).fetchall()
+        finally:
+            cur.close()
+
+
+    def get_job_for_enrichment(self, job_id: int) -> tuple[str, str, str | None] | None:
+        '''Returns `(url, job_key, description_hash)` for job `job_id`, or `None` if there is no such job.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            return cur.execute('SELECT url, job_key, description_hash FROM indeed_jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            cur.close()
+
+
+    def get_unenriched_jobs(self, from_id: int, limit: int) -> list[int]:
+        '''Returns the Ids of up to `limit` jobs from Id `from_id` on, whose full description was not stored.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            return [job_id for (job_id,) in cur.execute('''SELECT id FROM indeed_jobs WHERE id >= ? AND description_hash IS NULL 
+                                                        ORDER BY id LIMIT ?''', (from_id, limit))]
+        finally:
+            cur.close()
+
+
+    def reuse_original_description(self, job_id: int) -> bool:
+        '''Stores the description and salary of the original posting of job `job_id` for it, if it is a repost 
+        of a posting whose description was already stored. Returns whether it was.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                cur.execute('''UPDATE indeed_jobs SET (description_hash, salary) = (
+                                   SELECT o.description_hash, o.salary FROM indeed_jobs o WHERE o.id = indeed_jobs.duplicate_of)
+                               WHERE id = ? AND description_hash IS NULL AND EXISTS (
+                                   SELECT 1 FROM indeed_jobs o WHERE o.id = indeed_jobs.duplicate_of AND o.description_hash IS NOT NULL)''', 
+                            (job_id,))
+                reused: bool = cur.rowcount > 0
+                con.commit()
+        finally:
+            cur.close()
+        return reused
+
+
+    def store_description(self, job_id: int, description: str, salary: str) -> bool:
+        '''Stores the full `description` and `salary` of job `job_id`. Descriptions are stored compressed, once per 
+        distinct text, in `job_descriptions`, and referenced by their hash. Returns whether the text was new.
+        '''
+
+        description_hash: str = hashlib.sha1(description.encode()).hexdigest()
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                exists: bool = cur.execute('SELECT 1 FROM job_descriptions WHERE hash = ?', (description_hash,)).fetchone() is not None
+                if not exists:
+                    cur.execute('INSERT INTO job_descriptions(hash, content) VALUES (?, ?)', 
+                                (description_hash, zlib.compress(description.encode(), 9)))
+                cur.execute('UPDATE indeed_jobs SET description_hash = ?, salary = ? WHERE id = ?', (description_hash, salary, job_id))
+                con.commit()
+        finally:
+            cur.close()
+        return not exists
+
+
+    def get_full_description(self, job_id: int) -> str | None:
+        '''Returns the full description of job `job_id` fetched from its detail page, or `None` if not fetched.'''
+
+        con, cur = self.get_con_cur()
+        try:
+            row: tuple[bytes] | None = cur.execute('''SELECT d.content FROM indeed_jobs j 
+                                                   JOIN job_descriptions d ON d.hash = j.description_hash WHERE j.id = ?''', 
+                                                   (job_id,)).fetchone()
+        finally:
+            cur.close()
+        return zlib.decompress(row[0]).decode() if row is not None else None
+
+
+    def _update(self, cur: sqlite3.Cursor, job_id: int, field: str, value: str) -> bool | int:
+        '''Executes a single status change and returns the new value of `field`.'''
+
+        row: tuple | None = cur.execute(_update_statement(field, value), (job_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'No job with Id: {job_id}')
+        return int(row[0]) if field == "interviews" else bool(row[0])
+
+
+    def update_for_id(self, job_id: int, field: str, value: str = "") -> bool | int:
         '''Update the database `field` with the opposite `boolean` value for the specified Id. 
+        For the `interested` field, set it according to the provided operation `value`, `+` or `-`.
         For the `interviews` field, increase/decrease value according to provided operation `value`.'''
         
-        while self.busy:
-            await asyncio.sleep(1)
-
-        self.busy = True 
-        con, cur = self.get_con_cur()
-        status: bool | int
-
-        try:
-            if field == "interviews":
-                cur.execute(f'SELECT {field} FROM indeed_jobs WHERE id = {job_id}')
-                status = cur.fetchone()[0]
-                if value == "+":
-                    status += 1
-                elif value == "-" and status > 0:
-                    status -= 1
-                cur.execute(f'UPDATE indeed_jobs SET interviews = ? WHERE id = {job_id}', (status,))
-            elif field == "interested":
-                if value == "+":
-                    cur.execute(f'UPDATE indeed_jobs SET interested = ? WHERE id = {job_id}', (True,))
-                    status = True
-                else:
-                    cur.execute(f'UPDATE indeed_jobs SET interested = ? WHERE id = {job_id}', (False,))
-                    status = False
-            else:
-                cur.execute(f'SELECT {field} FROM indeed_jobs WHERE id = {job_id}')
-                status = not cur.fetchone()[0]
-                cur.execute(f'UPDATE indeed_jobs SET {field} = ? WHERE id = {job_id}', (status,))
-            con.commit()
+        return self.update_many([(job_id, field, value)])[0]
+
+
+    def update_many(self, changes: list[tuple[int, str, str]]) -> list[bool | int]:
+        '''Applies many `(job_id, field, value)` status changes, as in `update_for_id`, in a single transaction.
+        Returns the new value for each change. If any Id does not exist, no change is applied.
+        '''
+
+        con, cur = self.get_con_cur()
+        try:
+            with self.write_lock:
+                try:
+                    statuses: list[bool | int] = [self._update(cur, job_id, field, value) for job_id, field, value in changes]
+                    con.commit()
+                except Exception:
+                    con.rollback()
+                    raise
         finally:
             cur.close()
-            con.close()
-            self.busy = False
-            return status
\ No newline at end of file
+
+        return statuses
+
+
+class AsyncIndeedDb:
+
+    def __init__(self, indeed_db: IndeedDb) -> None:
+        '''Non-blocking interface to `IndeedDb` for the Discord bot event loop. Every call runs on a dedicated 
+        database thread, so slow disk I/O never blocks the loop.
+        '''
+
+        self.indeed_db: IndeedDb = indeed_db
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indeed-db")
+
+
+    async def run(self, func: Callable, *args) -> Any:
+        '''Runs `func(*args)` on the database thread and returns its result.'''
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+
+    async def get_unnotified_jobs(self, job_ids: list[int] | None = None) -> list[tuple[int, str, str, str, str]]:
+        return await self.run(self.indeed_db.get_unnotified_jobs, job_ids)
+
+
+    async def mark_notified(self, notifications: list[tuple[int, int]]) -> None:
+        await self.run(self.indeed_db.mark_notified, notifications)
+
+
+    async def get_job_id_for_message(self, message_id: int) -> int | None:
+        return await self.run(self.indeed_db.get_job_id_for_message, message_id)
+
+
+    async def search_jobs(self, terms: str, limit: int = 10) -> list[tuple[int, str, str, str, str]]:
+        return await self.run(self.indeed_db.search_jobs, terms, limit)
+
+
+    async def update_for_id(self, job_id: int, field: str, value: str = "") -> bool | int:
+        return await self.run(self.indeed_db.update_for_id, job_id, field, value)
+
+
+    async def update_many(self, changes: list[tuple[int, str, str]]) -> list[bool | int]:
+        return await self.run(self.indeed_db.update_many, changes)
+
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class JobWriter:
+
+    def __init__(self, indeed_db: IndeedDb, con: sqlite3.Connection, cur: sqlite3.Cursor) -> None:
+        '''Buffers new job rows and inserts them in batches, committing once every `db_batch_size` rows or 
+        `db_flush_ms` milliseconds, whichever comes first, or when `flush` is called.
+        The Ids of the inserted rows are published to the new jobs listeners of `indeed_db` after every commit.
+        '''
+
+        self.indeed_db: IndeedDb = indeed_db
+        self.con: sqlite3.Connection = con
+        self.cur: sqlite3.Cursor = cur
+
+        self.batch_size: int = indeed_db.config.db_batch_size
+        self.flush_sec: float = indeed_db.config.db_flush_ms / 1000
+        self.pending: list[tuple[str, str, str, str, str, str]] = []
+        self.last_flush: float = time.monotonic()
+        self.inserted: int = 0
+
+
+    def add(self, job_key: str, job_url: str, job_title: str, job_employer: str, job_description: str, job_date_posted: str) -> None:
+        '''Adds a job row to the buffer, flushing it if the batch is full or old enough.'''
+
+        self.pending.append((job_key, job_url, job_title, job_employer, job_description, job_date_posted))
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_sec:
+            self.flush()
+
+
+    def flush(self) -> int:
+        '''Inserts all buffered rows in one transaction. Returns the number of rows inserted.'''
+
+        job_ids: list[int] = self.indeed_db.insert_jobs(self.con, self.cur, self.pending)
+        self.inserted += len(job_ids)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.indeed_db.publish_new_jobs(job_ids)
+        return len(job_ids)
@@ -0,0 +1,83 @@
+import hashlib
+import re
+import struct
+
+
+# MinHash signature of `NUM_HASHES` values, split in `LSH_BANDS` bands of `LSH_ROWS` values for bucketing.
+# Two postings share at least one bucket with probability 1 - (1 - s^4)^16 for Jaccard similarity s:
+# about 0.99 at s = 0.7, 0.64 at s = 0.5 and 0.03 at s = 0.2.
+NUM_HASHES: int = 64
+LSH_BANDS: int = 16
+LSH_ROWS: int = NUM_HASHES // LSH_BANDS
+SHINGLE_SIZE: int = 5
+# Descriptions with fewer shingles, such as empty or one-line card snippets, are too short to compare.
+MIN_SHINGLES: int = 20
+
+SIGNATURE_FORMAT: struct.Struct = struct.Struct(f'<{NUM_HASHES}I')
+
+REGEX_NON_WORD: re.Pattern = re.compile(r"[\W_]+")
+
+
+def shingles(text: str) -> set[bytes]:
+    '''Returns the character `SHINGLE_SIZE`-grams of `text`, lowercased with punctuation collapsed to spaces.'''
+
+    data: bytes = REGEX_NON_WORD.sub(" ", text.lower()).strip().encode()
+    if len(data) <= SHINGLE_SIZE:
+        return {data}
+    return {data[i:i + SHINGLE_SIZE] for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> tuple[int, ...] | None:
+    '''Returns the MinHash signature of `text`, or `None` if it has fewer than `MIN_SHINGLES` shingles. Each shingle 
+    is hashed once into `NUM_HASHES` independent 32 bit hashes with the `SHAKE128` extendable-output function, 
+    and the signature keeps the minimum of each.
+    '''
+
+    text_shingles: set[bytes] = shingles(text)
+    if len(text_shingles) < MIN_SHINGLES:
+        return None
+    rows: list[tuple[int, ...]] = [SIGNATURE_FORMAT.unpack(hashlib.shake_128(shingle).digest(SIGNATURE_FORMAT.size)) 
+                                   for shingle in text_shingles]
+    return tuple(map(min, zip(*rows)))
+
+
+def posting_key(employer: str, job_title: str) -> str:
+    '''Returns the employer and title of a posting, lowercased with punctuation collapsed to spaces. 
+    Only postings with the same key are compared, as distinct jobs of an employer often share their description.
+    '''
+
+    return f'{REGEX_NON_WORD.sub(" ", employer.lower()).strip()}|{REGEX_NON_WORD.sub(" ", job_title.lower()).strip()}'
+
+
+def posting_signature(description: str) -> tuple[int, ...] | None:
+    '''Returns the MinHash signature of a posting, over its description, or `None` if it is too short to compare.'''
+
+    return minhash(description)
+
+
+def pack_signature(signature: tuple[int, ...]) -> bytes:
+    return SIGNATURE_FORMAT.pack(*signature)
+
+
+def unpack_signature(blob: bytes) -> tuple[int, ...]:
+    return SIGNATURE_FORMAT.unpack(blob)
+
+
+def lsh_buckets(signature: tuple[int, ...], key: str) -> list[int]:
+    '''Returns the bucket of every band of `signature` for postings with the `posting_key` `key`, as signed 64 bit 
+    integers for `sqlite`. The key is hashed into every bucket, so only postings with the same employer and title 
+    share buckets, however common their descriptions are among other employers.
+    '''
+
+    key_bytes: bytes = key.encode()
+    buckets: list[int] = []
+    for band in range(LSH_BANDS):
+        rows: bytes = struct.pack(f'<H{LSH_ROWS}I', band, *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        buckets.append(int.from_bytes(hashlib.blake2b(rows + key_bytes, digest_size=8).digest(), "little", signed=True))
+    return buckets
+
+
+def similarity(signature: tuple[int, ...], other: tuple[int, ...]) -> float:
+    '''Returns the Jaccard similarity estimated from two signatures.'''
+
+    return sum(1 for a, b in zip(signature, other) if a == b) / NUM_HASHES
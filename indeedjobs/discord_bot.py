@@ -11,8 +11,30 @@ import discord.types
 from dotenv import load_dotenv
 
 from .configuration import Config
-from .database import IndeedDb
-from .utils import DISCORD_HELP, REGEX_ID_FROM_DISCORD
+from .database import AsyncIndeedDb, IndeedDb
+from .metrics import RateLimitCounter, metrics
+from .notifier import MAX_MESSAGE_LENGTH, NotificationDispatcher
+from .utils import DISCORD_HELP, REGEX_ID_FROM_DISCORD, LruCache
+
+
+MESSAGE_JOBS_CACHE_SIZE: int = 10_000
+
+# Delay before notifying, so that batches committed in quick succession are sent together.
+NEW_JOBS_DEBOUNCE_SEC: float = 2
+
+# `!bulk` actions and the `(field, operation)` they apply, as in `IndeedDb.update_for_id`.
+BULK_ACTIONS: dict[str, tuple[str, str]] = {
+    "interested": ("interested", "+"),
+    "uninterested": ("interested", "-"),
+    "interview": ("interviews", "+"),
+    "applied": ("applied", ""),
+    "response": ("response", ""),
+    "rejected": ("rejected", ""),
+    "offer": ("job_offer", "")
+}
+
+# Results returned by `!search`.
+SEARCH_RESULTS: int = 10
 
 
 class DiscordBot(Bot):
@@ -22,6 +44,16 @@ class DiscordBot(Bot):
 
         self.config = config
         self.indeed_db = indeed_db
+        self.adb = AsyncIndeedDb(indeed_db)
+        self.message_jobs = LruCache(MESSAGE_JOBS_CACHE_SIZE)  # Discord message Id -> job Id.
+        self.dispatcher = NotificationDispatcher(config, self.adb, self.message_jobs)
+
+        # New job Ids are pushed here from the scraper thread, see `notify_new_jobs`.
+        self.new_job_ids: asyncio.Queue[list[int]] = asyncio.Queue()
+        self.event_loop: asyncio.AbstractEventLoop | None = None
+        self.notify_lock: asyncio.Lock = asyncio.Lock()
+        indeed_db.add_new_jobs_listener(self.notify_new_jobs)
+        logging.getLogger("discord.http").addHandler(RateLimitCounter())
         
         command_prefix = "!"
         description = "Indeed Job scraper, type `/help` in the config channel for some useful commands and interactions."
@@ -46,11 +78,56 @@ class DiscordBot(Bot):
             self.config.kill = True
 
 
-    async def _get_id_from_reply(self, ctx: Context) -> int:
-        '''Retrieves the Id of the message being replied to.'''
+    async def _get_job_id(self, message_id: int) -> int | None:
+        '''Returns the Id of the job notified in the bot message `message_id`, from the cache or the database.
+        Only falls back to fetching the message and parsing its content for notifications sent before message Ids 
+        were recorded. Returns `None` if the message is not a job notification from the bot.
+        '''
+
+        job_id: int | None = self.message_jobs.get(message_id)
+        if job_id is None:
+            job_id = await self.adb.get_job_id_for_message(message_id)
+
+        if job_id is None:
+            message: discord.Message = await self.notif_channel.fetch_message(message_id)
+            if message.author.id != self.user.id:  # Message not originally from bot.
+                return None
+            ids: list[str] = re.findall(REGEX_ID_FROM_DISCORD, message.content)
+            if not ids:
+                return None
+            job_id = int(ids[0])
+
+        self.message_jobs.put(message_id, job_id)
+        return job_id
+
 
-        message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        return int(re.findall(REGEX_ID_FROM_DISCORD, message.content)[0])
+    async def _get_id_from_reply(self, ctx: Context) -> int | None:
+        '''Retrieves the Id of the message being replied to. If it is not a single job notification, 
+        tells the user to use `!bulk` and returns `None`.
+        '''
+
+        job_id: int | None = await self._get_job_id(ctx.message.reference.message_id)
+        if job_id is None:
+            await ctx.send("Replied message is not a single job notification, use `!bulk` for digests.", delete_after=30)
+        return job_id
+
+
+    def notify_new_jobs(self, job_ids: list[int]) -> None:
+        '''Thread-safe hand-off of newly inserted job Ids from the scraper to the bot event loop.'''
+
+        if self.event_loop is None or self.event_loop.is_closed():
+            return  # Not connected yet, the periodic check will pick them up.
+        self.event_loop.call_soon_threadsafe(self.new_job_ids.put_nowait, job_ids)
+
+
+    async def _notify(self, job_ids: list[int] | None = None) -> None:
+        '''Notifies the user of the jobs not notified yet, among `job_ids` if provided.'''
+
+        async with self.notify_lock:  # So that the same job is never picked up twice.
+            new_jobs = await self.adb.get_unnotified_jobs(job_ids)
+            if new_jobs:
+                notified: int = await self.dispatcher.dispatch(self.notif_channel, new_jobs)
+                self.logger.info(f'Notified {notified} of {len(new_jobs)} new jobs.')
 
 
     async def _get_channels(self) -> None:
@@ -99,8 +176,10 @@ class DiscordBot(Bot):
             if ctx.message.reference is None or not ctx.channel.id == self.notif_channel_id:
                 return
 
-            job_id: int = await self._get_id_from_reply(ctx)
-            application: bool = await self.indeed_db.update_for_id(job_id, "applied")
+            job_id: int | None = await self._get_id_from_reply(ctx)
+            if job_id is None:
+                return
+            application: bool = await self.adb.update_for_id(job_id, "applied")
 
             if application:
                 await ctx.send(f'Added application for job with Id: {job_id}', delete_after=30)
@@ -117,8 +196,10 @@ class DiscordBot(Bot):
             if ctx.message.reference is None or not ctx.channel.id == self.notif_channel_id:
                 return
 
-            job_id: int = await self._get_id_from_reply(ctx)
-            response: bool  = await self.indeed_db.update_for_id(job_id, "response")
+            job_id: int | None = await self._get_id_from_reply(ctx)
+            if job_id is None:
+                return
+            response: bool  = await self.adb.update_for_id(job_id, "response")
 
             if response:
                 await ctx.send(f'Added response for job with Id: {job_id}', delete_after=30)
@@ -135,8 +216,10 @@ class DiscordBot(Bot):
             if ctx.message.reference is None or not ctx.channel.id == self.notif_channel_id:
                 return
 
-            job_id: int = await self._get_id_from_reply(ctx)
-            rejection: bool  = await self.indeed_db.update_for_id(job_id, "rejected", True)
+            job_id: int | None = await self._get_id_from_reply(ctx)
+            if job_id is None:
+                return
+            rejection: bool  = await self.adb.update_for_id(job_id, "rejected", True)
 
             if rejection:
                 await ctx.send(f'Added rejection for job with Id: {job_id}', delete_after=30)
@@ -153,8 +236,10 @@ class DiscordBot(Bot):
             if ctx.message.reference is None or not ctx.channel.id == self.notif_channel_id:
                 return
 
-            job_id: int = await self._get_id_from_reply(ctx)
-            offer: bool  = await self.indeed_db.update_for_id(job_id, "job_offer", True)
+            job_id: int | None = await self._get_id_from_reply(ctx)
+            if job_id is None:
+                return
+            offer: bool  = await self.adb.update_for_id(job_id, "job_offer", True)
 
             if offer:
                 await ctx.send(f'Added job offer for job with Id: {job_id}', delete_after=30)
@@ -173,13 +258,71 @@ class DiscordBot(Bot):
             if ctx.message.reference is None or not ctx.channel.id == self.notif_channel_id:
                 return
             
-            job_id: int = await self._get_id_from_reply(ctx)
-            interviews: int = await self.indeed_db.update_for_id(job_id, "interviews", operation)
+            job_id: int | None = await self._get_id_from_reply(ctx)
+            if job_id is None:
+                return
+            interviews: int = await self.adb.update_for_id(job_id, "interviews", operation)
 
             await ctx.send(f'Updated {interviews} interview round(s) for job with Id: {job_id}', delete_after=30)
             await ctx.message.delete()
 
 
+        @self.command()
+        @exception_handler_async
+        async def bulk(ctx: Context, action: str, *job_ids: int):
+            '''Applies the same update to all the provided job Ids in a single transaction, for bulk triage.'''
+
+            if not ctx.channel.id == self.notif_channel_id:
+                return
+
+            if action not in BULK_ACTIONS or not job_ids:
+                await ctx.send(f'Usage: `!bulk {{{"|".join(BULK_ACTIONS)}}} id [id ...]`', delete_after=30)
+                return
+
+            field, value = BULK_ACTIONS[action]
+            statuses: list[bool | int] = await self.adb.update_many([(job_id, field, value) for job_id in job_ids])
+
+            summary: str = ", ".join(f'{job_id}: {status}' for job_id, status in zip(job_ids, statuses))
+            await ctx.send(f'Updated `{field}` for job(s) with Id: {summary}', delete_after=30)
+            await ctx.message.delete()
+
+
+        @self.command()
+        @exception_handler_async
+        async def search(ctx: Context, *, terms: str = ""):
+            '''Sends the jobs best matching `terms` in their title, employer or description, with a snippet of each.'''
+
+            if not ctx.channel.id == self.config_channel_id:
+                return
+
+            if not terms.strip():
+                await ctx.send("Usage: `!search terms`", delete_after=30)
+                return
+
+            jobs: list[tuple[int, str, str, str, str]] = await self.adb.search_jobs(terms, SEARCH_RESULTS)
+            if not jobs:
+                await ctx.send(f'No jobs found for: {terms}')
+                return
+
+            text: str = f'Best {len(jobs)} job(s) for: {terms}'
+            for job_id, url, job_title, employer, snippet in jobs:
+                entry: str = f'\n\n**Id**: {job_id} | **{job_title}** - {employer}\n<{url}>\n> {" ".join(snippet.split())}'
+                if len(text) + len(entry) > MAX_MESSAGE_LENGTH:
+                    break
+                text += entry
+            await ctx.send(text)
+
+
+        @self.command()
+        @exception_handler_async
+        async def stats(ctx: Context):
+            '''Sends a summary of the application metrics.'''
+
+            if not ctx.channel.id == self.config_channel_id:
+                return
+            await ctx.send(f'```\n{metrics.summary()[:MAX_MESSAGE_LENGTH - 8]}\n```')
+
+
         @self.command()
         @exception_handler_async
         async def close(ctx: Context) -> None:
@@ -199,19 +342,21 @@ class DiscordBot(Bot):
             '''
             
             # print(payload.emoji.name, payload.emoji.id)
-            if payload.channel_id != self.notif_channel_id:
+            if payload.channel_id != self.notif_channel_id or payload.user_id == self.user.id:
+                return
+            if payload.emoji.name not in ("✅", "❌"):
                 return
 
-            message: discord.Message = await self.get_channel(payload.channel_id).fetch_message(payload.message_id)
-            if message.author.id != self.user.id:  # Reaction on message not originally from bot.
+            job_id: int | None = await self._get_job_id(payload.message_id)
+            if job_id is None:  # Reaction on message not originally from bot.
                 return
+            message: discord.PartialMessage = self.notif_channel.get_partial_message(payload.message_id)
             
-            if payload.emoji.name == "✅" and payload.user_id != self.user.id:
-                job_id = int(re.findall(REGEX_ID_FROM_DISCORD, message.content)[0])
-                _ = await self.indeed_db.update_for_id(job_id, "interested", "+")
-                await message.remove_reaction("❌", member=discord.Object(self.user.id))
-                await message.channel.send(f'Added interest in Job with Id: {job_id}', delete_after=30)
-            elif payload.emoji.name == "❌" and payload.user_id != self.user.id:
+            if payload.emoji.name == "✅":
+                _ = await self.adb.update_for_id(job_id, "interested", "+")
+                await message.remove_reaction("❌", discord.Object(self.user.id))
+                await self.notif_channel.send(f'Added interest in Job with Id: {job_id}', delete_after=30)
+            elif payload.emoji.name == "❌":
                 await message.delete()
         
 
@@ -220,18 +365,17 @@ class DiscordBot(Bot):
         async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent) -> None:
             '''On `interested` reaction removal, update database, add deletion reaction and inform user.'''
 
-            if payload.channel_id != self.notif_channel_id:
+            if payload.channel_id != self.notif_channel_id or payload.emoji.name != "✅":
                 return
             
-            message: discord.Message = await self.get_channel(payload.channel_id).fetch_message(payload.message_id)
-            if message.author.id != self.user.id:  # Reaction on message not originally from bot.
+            job_id: int | None = await self._get_job_id(payload.message_id)
+            if job_id is None:  # Reaction on message not originally from bot.
                 return
+            message: discord.PartialMessage = self.notif_channel.get_partial_message(payload.message_id)
 
-            if payload.emoji.name == "✅":
-                job_id = int(re.findall(REGEX_ID_FROM_DISCORD, message.content)[0])
-                _ = await self.indeed_db.update_for_id(job_id, "interested", "-")
-                await message.add_reaction("❌")
-                await message.channel.send(f'Removed interest in Job with Id: {job_id}', delete_after=30)
+            _ = await self.adb.update_for_id(job_id, "interested", "-")
+            await message.add_reaction("❌")
+            await self.notif_channel.send(f'Removed interest in Job with Id: {job_id}', delete_after=30)
 
 
         @tasks.loop(seconds=1)
@@ -245,46 +389,30 @@ class DiscordBot(Bot):
 
             
 
-        @tasks.loop(seconds=self.config.bot_delay_sec)
+        @tasks.loop(seconds=0)
         @exception_handler_async
-        async def _tasks_loop() -> None:
-            '''Checks if new job postings are in the database and notifies the user.'''
-
-            while self.indeed_db.busy:
-                if self.config.kill:
-                    return
-                
-                try:
-                    await asyncio.sleep(1)
-                except asyncio.exceptions.CancelledError:
-                    pass
+        async def _new_jobs_loop() -> None:
+            '''Notifies the user of new job postings as soon as the scraper inserts them.'''
 
-            if not self.indeed_db.new_jobs:
+            try:
+                job_ids: list[int] = await asyncio.wait_for(self.new_job_ids.get(), timeout=1)
+            except asyncio.TimeoutError:
                 return
 
-            self.indeed_db.busy = True 
-            con, cur = self.indeed_db.get_con_cur()
+            await asyncio.sleep(NEW_JOBS_DEBOUNCE_SEC)
+            while not self.new_job_ids.empty():
+                job_ids.extend(self.new_job_ids.get_nowait())
+            await self._notify(job_ids)
 
-            try:
-                new_jobs = cur.execute('SELECT id, url, job_title, employer, description FROM indeed_jobs WHERE notified = 0')
-                for job in new_jobs.fetchall():
-                    text = '''**Id**: {}
-**URL**: {}
-**Title**: {}
-**Employer**: {}
-**Description**: {}'''.format(*job)
-                    message: discord.Message = await self.notif_channel.send(text)
-                    await asyncio.sleep(2)
-                    await message.add_reaction("✅")
-                    await asyncio.sleep(2)
-                    await message.add_reaction("❌")
-                    cur.execute('UPDATE indeed_jobs SET notified = 1 WHERE id = ?', (job[0],))
-                    con.commit()
-            finally:
-                cur.close()
-                con.close()
-                self.indeed_db.new_jobs = False
-                self.indeed_db.busy = False
+
+        @tasks.loop(seconds=self.config.bot_delay_sec)
+        @exception_handler_async
+        async def _tasks_loop() -> None:
+            '''Checks for job postings the user was not notified of, e.g. from before the bot was connected 
+            or after a failed send, and notifies the user.
+            '''
+
+            await self._notify()
 
 
         @self.event
@@ -293,7 +421,11 @@ class DiscordBot(Bot):
             
             await self._get_channels()
             await self.config_channel.send("Bot is live! Type `!help` for a list of available commands.")
-            asyncio.gather(_kill_loop.start(), _tasks_loop.start())
+            self.event_loop = asyncio.get_running_loop()
+            asyncio.gather(_kill_loop.start(), _tasks_loop.start(), _new_jobs_loop.start())
 
         self.logger.info("Starting bot.")
-        super().run(self.token)
+        try:
+            super().run(self.token)
+        finally:
+            self.adb.close()
@@ -0,0 +1,172 @@
+import logging
+import queue
+import threading
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .browser import DriverPool, DriverSession
+from .configuration import Config
+from .database import IndeedDb
+from .fetchers import HttpFetcher
+from .metrics import metrics
+from .parser import JOB_DESCRIPTION_SELECTOR, parse_job_page
+from .utils import get_job_key
+
+if TYPE_CHECKING:
+    from .indeed import DomainThrottle
+
+
+class JobEnricher:
+
+    def __init__(self, config: Config, indeed_db: IndeedDb, drivers: DriverPool, http_fetcher: HttpFetcher | None,
+                 throttle: "DomainThrottle") -> None:
+        '''Fetches the full description and salary of new jobs from their detail pages, in background workers.'''
+
+        self.config: Config = config
+        self.indeed_db: IndeedDb = indeed_db
+        self.drivers: DriverPool = drivers
+        self.http_fetcher: HttpFetcher | None = http_fetcher
+        self.throttle: "DomainThrottle" = throttle
+        self.job_ids: queue.Queue[int | None] = queue.Queue(maxsize=max(config.enrichment_queue_size, 1))
+        self.workers: list[threading.Thread] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.skipped_from: int | None = None  # Lowest Id of the jobs skipped while the queue was full.
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+        indeed_db.add_new_jobs_listener(self.enqueue)
+
+
+    def enqueue(self, job_ids: list[int]) -> None:
+        '''Queues new jobs for enrichment without blocking the caller.'''
+
+        for job_id in job_ids:
+            try:
+                self.job_ids.put_nowait(job_id)
+            except queue.Full:
+                metrics.inc("enrichment_dropped")
+                self.logger.debug(f'Enrichment queue full, skipping job with Id: {job_id}')
+                with self.lock:
+                    self.skipped_from = job_id if self.skipped_from is None else min(self.skipped_from, job_id)
+
+
+    def _requeue_skipped(self) -> None:
+        '''Queues the jobs skipped while the queue was full and still missing their description, as much as fits.'''
+
+        with self.lock:
+            room: int = self.job_ids.maxsize - self.job_ids.qsize()
+            if self.skipped_from is None or room <= 0:
+                return
+            job_ids: list[int] = self.indeed_db.get_unenriched_jobs(self.skipped_from, room)
+            self.skipped_from = job_ids[-1] + 1 if len(job_ids) == room else None
+        self.enqueue(job_ids)
+
+
+    def start(self) -> None:
+        for _ in range(max(self.config.enrichment_workers, 1)):
+            worker = threading.Thread(target=self._worker, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+
+    def stop(self) -> None:
+        '''Stops the workers once they finish the job they are fetching. Jobs still queued are skipped.'''
+
+        for _ in self.workers:
+            while True:
+                try:
+                    self.job_ids.put_nowait(None)
+                    break
+                except queue.Full:
+                    try:
+                        self.job_ids.get_nowait()
+                    except queue.Empty:
+                        pass
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+
+    def _fetch_with_browser(self, url: str) -> str:
+        '''Loads the detail page in a pooled browser session and returns its source.'''
+
+        session: DriverSession = self.drivers.acquire()
+        broken: bool = True
+        try:
+            session.driver.get(url)
+            try:
+                WebDriverWait(session.driver, self.config.selenium_sleep_sec, poll_frequency=0.25).until(
+                    lambda d: d.find_elements(By.CSS_SELECTOR, JOB_DESCRIPTION_SELECTOR))
+            except TimeoutException:
+                pass
+            page_source: str = session.driver.page_source
+            broken = False
+            return page_source
+        finally:
+            self.drivers.release(session, broken)
+
+
+    def _enrich(self, job_id: int) -> None:
+        '''Fetches and stores the full description of a single job, unless already stored.'''
+
+        job: tuple[str, str, str | None] | None = self.indeed_db.get_job_for_enrichment(job_id)
+        if job is None:
+            return
+        url, job_key, description_hash = job
+        if description_hash is not None or self.indeed_db.reuse_original_description(job_id):
+            metrics.inc("enrichment_cached")
+            return
+
+        if job_key is None or ":" in job_key:  # Duplicate or keyless rows of old databases, see `_migrate_job_key`.
+            job_key = get_job_key(url or "")
+            if job_key is None:
+                return
+
+        detail_url: str = f'https://{urlsplit(url).netloc}/viewjob?jk={job_key}'
+        if not self.throttle.wait(detail_url, self.config):
+            return
+
+        with metrics.time("enrichment_fetch"):
+            page_source: str | None = self.http_fetcher.fetch(detail_url) if self.http_fetcher is not None else None
+            page: dict = parse_job_page(page_source or "")
+        if not page["description"] and not self.config.kill:
+            # The browser is a second request to the domain.
+            if self.http_fetcher is not None and not self.throttle.wait(detail_url, self.config):
+                return
+            with metrics.time("enrichment_fetch"):
+                page = parse_job_page(self._fetch_with_browser(detail_url))
+
+        self.throttle.report(detail_url, page["challenge"] or not page["description"])
+        if not page["description"]:
+            metrics.inc("enrichment_failures")
+            self.logger.warning(f'No description found on the detail page of job with Id: {job_id}')
+            return
+
+        if not self.indeed_db.store_description(job_id, page["description"], page["salary"]):
+            metrics.inc("enrichment_duplicates")
+        metrics.inc("enrichment_fetched")
+
+
+    def _worker(self) -> None:
+        '''Enriches queued jobs until it receives `None` or the application is signaled to close.'''
+
+        while not self.config.kill:
+            try:
+                job_id: int | None = self.job_ids.get(timeout=1)
+            except queue.Empty:
+                try:
+                    self._requeue_skipped()
+                except Exception as e:
+                    self.logger.exception(e)
+                continue
+            if job_id is None:
+                break
+
+            try:
+                self._enrich(job_id)
+            except Exception as e:  # Enrichment is best effort, never stop the application for it.
+                metrics.inc("enrichment_failures")
+                self.logger.exception(e)
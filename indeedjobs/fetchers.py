@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import threading
+from typing import Callable
+
+import aiohttp
+
+from .browser import USER_AGENT
+from .configuration import Config
+
+
+HTTP_HEADERS: dict[str, str] = {
+    "User-Agent": USER_AGENT.removeprefix("userAgent="),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.7"
+}
+
+# Seconds an idle connection to a domain is kept open for the next request.
+HTTP_KEEPALIVE_SEC: float = 60
+
+
+class HttpFetcher:
+
+    def __init__(self, config: Config, url_for: Callable[[str], str] | None = None) -> None:
+        '''Fetches results pages with plain HTTP requests instead of a browser, for the `http` fetch backend.
+
+        Requests from all scraper workers share a single `aiohttp` session, running on its own event loop thread,
+        which keeps connections to each `Indeed` domain alive and keeps the cookies they set across pages.
+        `url_for` maps every URL before it is requested, e.g. to `ReplayServer.url_for` to fetch from a local server.
+        '''
+
+        self.config: Config = config
+        self.url_for: Callable[[str], str] | None = url_for
+        self.lock: threading.Lock = threading.Lock()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self.session: aiohttp.ClientSession | None = None
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    async def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit_per_host=max(self.config.scraper_workers, 1), keepalive_timeout=HTTP_KEEPALIVE_SEC)
+        return aiohttp.ClientSession(connector=connector,
+                                     cookie_jar=aiohttp.CookieJar(unsafe=self.url_for is not None),  # Allow IP hosts locally.
+                                     headers=HTTP_HEADERS,
+                                     timeout=aiohttp.ClientTimeout(total=self.config.selenium_sleep_sec))
+
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        '''Starts the event loop thread and the session on first use.'''
+
+        with self.lock:
+            if self.loop is None:
+                loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, daemon=True)
+                thread.start()
+                self.session = asyncio.run_coroutine_threadsafe(self._create_session(), loop).result()
+                self.loop, self.thread = loop, thread
+            return self.loop
+
+
+    async def _get(self, url: str) -> str | None:
+        async with self.session.get(self.url_for(url) if self.url_for else url) as response:
+            if response.status != 200:
+                self.logger.debug(f'{url} returned HTTP {response.status}.')
+                return None
+            return await response.text()
+
+
+    def fetch(self, url: str) -> str | None:
+        '''Returns the HTML of the page at `url`, or `None` if the request failed or did not return it.'''
+
+        loop: asyncio.AbstractEventLoop = self._start()
+        try:
+            return asyncio.run_coroutine_threadsafe(self._get(url), loop).result()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.warning(f'HTTP request to {url} failed: {e!r}')
+            return None
+
+
+    def close(self) -> None:
+        '''Closes the session and stops the event loop thread.'''
+
+        with self.lock:
+            if self.loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop, self.thread, self.session = None, None, None
@@ -1,16 +1,116 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 import logging
-import re
+import queue
+import threading
 import time
+from urllib.parse import urlsplit
+import zlib
 
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
 
+from .browser import DriverPool, DriverSession, firefox_options
 from .configuration import Config
-from .database import IndeedDb
-from .utils import INDEED_COUNTRIES 
+from .database import IndeedDb, JobWriter
+from .enrichment import JobEnricher
+from .fetchers import HttpFetcher
+from .metrics import metrics
+from .normalize import PostingNormalizer
+from .parser import CHALLENGE_SELECTOR, POPUP_SELECTOR, READY_SELECTOR, parse_results_page
+from .planner import SearchPlanner
+from .replay import ReplayDriver, ReplayServer, record_page
+from .scheduler import QueryScheduler
+from .utils import INDEED_COUNTRIES, get_job_key
+
+
+MAX_PAGE_RETRIES: int = 2
+
+# Extracts every posting on a results page in a single WebDriver round trip.
+EXTRACT_POSTINGS_SCRIPT: str = '''
+const text = (root, selector) => {
+    const element = root.querySelector(selector);
+    return element ? element.innerText.trim() : "";
+};
+const postings = Array.from(document.querySelectorAll(".job_seen_beacon")).map(card => {
+    const link = card.querySelector(".jcs-JobTitle");
+    return {
+        url: link ? link.href : "",
+        title: link ? text(link, "span") : "",
+        employer: text(card, "[data-testid='company-name']"),
+        description: Array.from(card.querySelectorAll("li")).map(li => li.innerText.trim()).filter(t => t).join("\\n"),
+        posted: text(card, "[data-testid='myJobsStateDate']")
+    };
+});
+const next = document.querySelector("[data-testid='pagination-page-next']");
+return {postings: postings, next_url: next ? next.href : null};
+'''
+
+
+class PageResult:
+
+    def __init__(self, url: str, error: Exception | None = None) -> None:
+        '''Result of fetching a single search results page, passed from a scraper worker to the writer.'''
+
+        self.url: str = url
+        self.error: Exception | None = error
+        self.query: str = url
+        self.page: int = 1
+        self.found: int = 0
+        self.job_keys: list[str] = []  # Every job key on the page in order, including those already in the database.
+        self.postings: list[dict[str, str]] = []
+        self.next_url: str | None = None
+        self.blocked: bool = False  # Challenge page, or page never became ready.
+
+
+class DomainThrottle:
+
+    def __init__(self, min_interval_sec: float, max_interval_sec: float) -> None:
+        '''Thread-safe throttle spacing out requests to the same `Indeed` domain across all scraper workers.
+        The delay for a domain starts at `min_interval_sec`, doubles (up to `max_interval_sec`) every time the domain 
+        returns a challenge or a page that never loads, and halves back towards the minimum on every healthy page.
+        '''
+
+        self.min_interval_sec: float = min_interval_sec
+        self.max_interval_sec: float = max(max_interval_sec, min_interval_sec)
+        self.lock: threading.Lock = threading.Lock()
+        self.next_slot: dict[str, float] = {}
+        self.interval: dict[str, float] = {}
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def wait(self, url: str, config: Config) -> bool:
+        '''Reserves the next request slot for the domain of `url` and sleeps until it is reached.
+        Returns `False` if the application was signaled to close while waiting.
+        '''
+
+        domain: str = urlsplit(url).netloc
+        with self.lock:
+            slot: float = max(time.monotonic(), self.next_slot.get(domain, 0))
+            self.next_slot[domain] = slot + self.interval.get(domain, self.min_interval_sec)
+
+        while (remaining := slot - time.monotonic()) > 0:
+            if config.kill:
+                return False
+            time.sleep(min(remaining, 1))
+        return not config.kill
+
+
+    def report(self, url: str, blocked: bool) -> None:
+        '''Adapts the delay for the domain of `url` to the outcome of the last request.'''
+
+        domain: str = urlsplit(url).netloc
+        with self.lock:
+            interval: float = self.interval.get(domain, self.min_interval_sec)
+            if blocked:
+                interval = min(max(interval * 2, 1), self.max_interval_sec)
+                self.logger.warning(f'{domain} returned a challenge or empty page, backing off to {interval:.1f}s.')
+                # Push back requests already scheduled as well.
+                self.next_slot[domain] = max(self.next_slot.get(domain, 0), time.monotonic() + interval)
+            else:
+                interval = max(interval / 2, self.min_interval_sec)
+            self.interval[domain] = interval
 
 
 class IndeedScraper:
@@ -23,14 +123,38 @@ class IndeedScraper:
 
         self.logger: logging.Logger = logging.getLogger(__name__)
 
-        self.options: Options = Options()
-        self.options.add_argument("--headless")
-        self.options.set_preference("general.useragent.override", 
-                                    "userAgent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0")
-        
+        # Job keys already in the database, loaded once on the first scrape and updated as new jobs are inserted.
+        self.job_keys: set[str] | None = None
+        self.parse_pool: ProcessPoolExecutor | None = None
+        # `(shard, shards)` when running as one of the scraper processes of the sharded mode, see `sharding`.
+        self.shard: tuple[int, int] | None = None
+        self.planner: SearchPlanner = SearchPlanner(config, indeed_db)
+        self.normalizer: PostingNormalizer = PostingNormalizer(config)
+        # Spacing of the requests to each domain, kept across scrapes so the backoff from challenges holds.
+        self.throttle: DomainThrottle = DomainThrottle(config.domain_min_interval_sec, config.domain_max_interval_sec)
+        # Browser sessions kept open across scrape cycles.
+        self.drivers: DriverPool = DriverPool(config, self._create_driver)
+        # With the `http` fetch backend, pages are requested without a browser first, from a local server in replay mode.
+        self.replay_server: ReplayServer | None = None
+        self.http_fetcher: HttpFetcher | None = None
+        if config.fetch_backend == "http":
+            if config.replay_dir:
+                self.replay_server = ReplayServer(config.replay_dir)
+                self.replay_server.start()
+                self.http_fetcher = HttpFetcher(config, self.replay_server.url_for)
+            else:
+                self.http_fetcher = HttpFetcher(config)
+        # Fetches the detail pages of new jobs in the background, see `JobEnricher`.
+        self.enricher: JobEnricher | None = None
+        if config.enrichment_enabled:
+            self.enricher = JobEnricher(config, indeed_db, self.drivers, self.http_fetcher,
+                                        DomainThrottle(config.enrichment_interval_sec, config.domain_max_interval_sec))
+
 
     def _construct_urls(self) -> list[str]:
-        '''Creates and returns a list of URLs for each location and job title specified in the configuration.'''
+        '''Creates and returns a list of URLs for each location and job title specified in the configuration.
+        Locations and titles differing only in case or spacing produce the same URL, which is only listed once.
+        '''
 
         url_list: list[str] = []
         try:
@@ -43,151 +167,465 @@ class IndeedScraper:
                         continue
                 
                 for city in cities:
-                    city = city.replace(" ", "+").replace(",", "%2C")
+                    city = " ".join(city.lower().split()).replace(" ", "+").replace(",", "%2C")
                     for job_title in self.config.job_titles:
-                        job_title = job_title.replace(" ", "+")
+                        job_title = " ".join(job_title.lower().split()).replace(" ", "+")
                         url_list.append(f'https://{country_code}.indeed.com/jobs?q={job_title}&l={city}&sort=date')
         except Exception as e:
             self.logger.exception(e)
             self.config.kill = True
 
+        return list(dict.fromkeys(url_list))
+
+
+    def _shard_urls(self, url_list: list[str]) -> list[str]:
+        '''Returns the search URLs of this scraper's shard in the sharded mode, and all of them otherwise.
+        With `shard_by` `country`, every search of a country goes to the same shard, so each `Indeed` domain is only
+        requested by one process and its throttle holds. With `hash`, searches are spread evenly across the shards.
+        '''
+
+        if self.shard is None:
+            return url_list
+
+        shard, shards = self.shard
+        if self.config.shard_by == "country":
+            domains: list[str] = sorted({urlsplit(url).netloc for url in url_list})
+            owned: set[str] = set(domains[shard::shards])
+            url_list = [url for url in url_list if urlsplit(url).netloc in owned]
+        else:
+            url_list = [url for url in url_list if zlib.crc32(url.encode()) % shards == shard]
+
+        if not url_list:
+            self.logger.warning(f'Shard {shard} of {shards} has no searches to scrape.')
         return url_list
 
 
-    def _get_date_posted(self, posted: str) -> str | None:
-        '''Returns the string representation of the date the job was posted in the format `YYYY-MM-DD`.'''
+    def _fetch_page_http(self, url: str) -> PageResult | None:
+        '''Requests a single search results page without a browser and extracts the postings not already in the
+        database. Returns `None` if the page needs the browser: the request failed, or the response is a challenge
+        or is not a rendered results page.
+        '''
+
+        with metrics.time("fetch_http"):
+            page_source: str | None = self.http_fetcher.fetch(url)
+        if page_source is None:
+            metrics.inc("http_fallbacks")
+            return None
+
+        with metrics.time("extract"):
+            page: dict = self._parse(page_source, url)
+            if page["challenge"] or not page["ready"]:
+                self.logger.debug(f'{url} needs the browser, falling back to it.')
+                metrics.inc("http_fallbacks")
+                return None
+
+            result = PageResult(url)
+            self._add_postings(result, page["postings"])
+            result.next_url = page["next_url"]
+
+        if self.config.record_dir:
+            record_page(self.config.record_dir, url, page_source)
+        return result
+
+
+    def _fetch_page(self, driver: webdriver.Firefox, url: str) -> PageResult:
+        '''Loads a single search results page and extracts the postings not already in the database.'''
+
+        result = PageResult(url)
+
+        with metrics.time("fetch_browser"):
+            driver.get(url)
+        ready: bool = self._wait_until_ready(driver)
+
+        if driver.find_elements(By.CSS_SELECTOR, POPUP_SELECTOR):  # If pop-up, refresh.
+            metrics.inc("popup_refreshes")
+            with metrics.time("fetch_browser"):
+                driver.get(url)
+            ready = self._wait_until_ready(driver)
+
+        if not ready or driver.find_elements(By.CSS_SELECTOR, CHALLENGE_SELECTOR):
+            result.blocked = True
+            return result
+
+        if self.config.record_dir:
+            record_page(self.config.record_dir, url, driver.page_source)
+
+        with metrics.time("extract"):
+            if self.config.extraction_mode == "elements":
+                self._extract_with_elements(driver, result)
+            elif self.config.extraction_mode == "html":
+                self._extract_with_html(driver, result)
+            else:
+                self._extract_with_script(driver, result)
+
+        return result
+
+
+    def _add_postings(self, result: PageResult, postings: list[dict]) -> None:
+        '''Adds the extracted `postings` that are neither ads nor already in the database to `result`.'''
+
+        for posting in postings:
+            result.found += 1
+            if "job_key" not in posting:
+                posting["job_key"] = None if "pagead" in posting["url"] else get_job_key(posting["url"])
+
+            if posting["job_key"] is None:  # Ad.
+                continue
+            result.job_keys.append(posting["job_key"])
+            if posting["job_key"] in self.job_keys:  # Already in db.
+                continue
+            result.postings.append(posting)
+
+
+    def _extract_with_script(self, driver: webdriver.Firefox, result: PageResult) -> None:
+        '''Extracts all postings and the next page URL with a single in-page `JavaScript` call.'''
+
+        page: dict = driver.execute_script(EXTRACT_POSTINGS_SCRIPT)
+        self._add_postings(result, page["postings"])
+        result.next_url = page["next_url"]
+
+
+    def _extract_with_html(self, driver: webdriver.Firefox, result: PageResult) -> None:
+        '''Grabs the page HTML once and parses it offline, in the parser process pool if one is configured.'''
+
+        page: dict = self._parse(driver.page_source, result.url)
+        self._add_postings(result, page["postings"])
+        result.next_url = page["next_url"]
+
+
+    def _parse(self, page_source: str, url: str) -> dict:
+        '''Parses a results page source, in the parser process pool if one is configured.'''
+
+        if self.parse_pool is not None:
+            return self.parse_pool.submit(parse_results_page, page_source, url).result()
+        return parse_results_page(page_source, url)
 
-        regex_id: re.Pattern = re.compile("([0-9]+)")
-        today = datetime.now()
+
+    def _extract_with_elements(self, driver: webdriver.Firefox, result: PageResult) -> None:
+        '''Extracts the postings and the next page URL element by element. Slower, as every lookup is a separate 
+        WebDriver round trip, but kept as a fallback in case the in-page script breaks.
+        '''
+
+        postings = driver.find_elements(By.CLASS_NAME, "job_seen_beacon")
+        
+        for posting in postings:
+            result.found += 1
+            job_url = posting.find_element(By.CLASS_NAME, "jcs-JobTitle").get_attribute("href")
+
+            if "pagead" in job_url:
+                continue
+
+            job_key: str | None = get_job_key(job_url)
+            if job_key is None:  # Ad.
+                continue
+            result.job_keys.append(job_key)
+            if job_key in self.job_keys:  # Already in db.
+                continue
+
+            description_parts = [paragraph.text for paragraph in posting.find_elements(By.CSS_SELECTOR, "li")]
+            result.postings.append({
+                "job_key": job_key,
+                "url": job_url,
+                "title": posting.find_element(By.CLASS_NAME, 'jcs-JobTitle').find_element(By.CSS_SELECTOR, 'span').text,
+                "employer": posting.find_element(By.CSS_SELECTOR, "[data-testid='company-name']").text,
+                "description": "\n".join([part for part in description_parts if part]),
+                "posted": posting.find_element(By.CSS_SELECTOR, "[data-testid='myJobsStateDate']").text
+            })
+
+        try:  # Get next page URL
+            result.next_url = driver.find_element(By.CSS_SELECTOR, "[data-testid='pagination-page-next']").get_attribute("href")
+        except NoSuchElementException:
+            pass
+
+
+    def _wait_until_ready(self, driver: webdriver.Firefox) -> bool:
+        '''Waits up to `selenium_sleep_sec` seconds for the results page to render. Returns whether it did.'''
 
         try:
-            if "today" in posted.lower() or "just" in posted.lower():
-                return today.strftime("%Y-%m-%d")
+            with metrics.time("page_ready_wait"):
+                WebDriverWait(driver, self.config.selenium_sleep_sec, poll_frequency=0.25).until(
+                    lambda d: d.find_elements(By.CSS_SELECTOR, READY_SELECTOR))
+            return True
+        except TimeoutException:
+            return False
 
-            posted = int(re.findall(regex_id, posted)[0])
-            diff = timedelta(hours=posted*24)
 
-            if diff.days > self.config.ignore_older_than_days:
-                return None
-            
-            final = today - diff
-            return final.strftime("%Y-%m-%d")
+    def _create_driver(self) -> webdriver.Firefox | ReplayDriver:
+        '''Creates the `webdriver` for a scraper worker, or a `ReplayDriver` serving recorded pages in replay mode.'''
+
+        if self.config.replay_dir:
+            return ReplayDriver(self.config.replay_dir)
+        return webdriver.Firefox(options=firefox_options(self.config))
+
+
+    def _worker(self, work_queue: queue.Queue, results_queue: queue.Queue) -> None:
+        '''Scraper worker fetching `(query, url, page)` work items from the shared queue until it receives `None`, 
+        over HTTP with the `http` fetch backend, or with a browser session from the pool otherwise or when the HTTP
+        response needs the browser. Passes each `PageResult` to the writer through the results queue.
+        '''
+
+        try:
+            while not self.config.kill:
+                try:
+                    item: tuple[str, str, int] | None = work_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+
+                query, url, page = item
+                with metrics.time("throttle_wait"):
+                    if not self.throttle.wait(url, self.config):
+                        break
+
+                result: PageResult | None = None
+                if self.http_fetcher is not None:
+                    try:
+                        result = self._fetch_page_http(url)
+                    except Exception as e:
+                        self.logger.exception(e)
+                        result = PageResult(url, error=e)
+
+                if result is None:
+                    if self.http_fetcher is not None:  # The browser is a second request to the domain.
+                        with metrics.time("throttle_wait"):
+                            if not self.throttle.wait(url, self.config):
+                                break
+                    session: DriverSession | None = None
+                    try:
+                        session = self.drivers.acquire()  # May start a new browser, which can fail too.
+                        result = self._fetch_page(session.driver, url)
+                    except Exception as e:  # Fails this query only, the scheduler retries it.
+                        self.logger.exception(e)
+                        result = PageResult(url, error=e)
+                    if session is not None:
+                        self.drivers.release(session, broken=result.error is not None)
+
+                metrics.inc("page_errors" if result.error is not None else "pages_blocked" if result.blocked else "pages_fetched")
+                self.throttle.report(url, result.blocked)
+                result.query = query
+                result.page = page
+                results_queue.put(result)
         except Exception as e:
             self.logger.exception(e)
             self.config.kill = True
 
 
-    def _scrape(self) -> None:
-        '''Scrapes `Indeed` for the specified job(s) and location(s) and adds any new ones to the database.
-        Additionally, if any new job posting is added, signals the Discord bot to notify the user.
+    def _write_postings(self, result: PageResult, writer: JobWriter, newest: dict[str, tuple[str, str | None]]) -> int:
+        '''Passes the new postings of a results page to the database writer, committing them once for the page. 
+        Records the newest job key of the query from its first page in `newest`. 
+        Returns the number of postings that were new and recent enough to be added.
         '''
 
-        url_list = self._construct_urls()
+        new_on_page: int = 0
+        for posting in result.postings:
+            if posting["job_key"] in self.job_keys:  # Also found by another query in this cycle.
+                continue
+            self.job_keys.add(posting["job_key"])
 
-        while self.indeed_db.busy:
-            time.sleep(1)
-        
-        self.indeed_db.busy = True
+            job_date_posted: str | None = self.normalizer.date_posted(posting["posted"])
+            if job_date_posted is None:
+                continue
+
+            writer.add(posting["job_key"], posting["url"], posting["title"], 
+                       posting["employer"], posting["description"], job_date_posted)
+            new_on_page += 1
+
+            if result.page == 1 and result.job_keys and posting["job_key"] == result.job_keys[0]:
+                newest[result.query] = (posting["job_key"], job_date_posted)
+
+        if result.page == 1 and result.job_keys and result.query not in newest:
+            newest[result.query] = (result.job_keys[0], None)
+
+        writer.flush()  # Commit once per results page.
+        return new_on_page
+
+
+    def _stop_paginating(self, result: PageResult, new_on_page: int, query_state: tuple[str | None, str | None, bool] | None) -> bool:
+        '''In incremental mode, whether to stop following the pages of a query after `result`, as the rest are known or too old.'''
+
+        if not self.config.incremental_pagination:
+            return False
+
+        if query_state is not None and query_state[0] in result.job_keys:
+            self.logger.debug(f'Reached the newest job of the last cycle on page {result.page} of {result.query}, stopping.')
+            return True
+        if any(self.normalizer.date_posted(posting["posted"]) is None for posting in result.postings):
+            self.logger.debug(f'Reached postings too old on page {result.page} of {result.query}, stopping.')
+            return True
+        # Not after an interrupted scrape, whose first pages may have been committed without the following ones.
+        if new_on_page == 0 and query_state is not None and query_state[2]:
+            self.logger.debug(f'Nothing new on page {result.page} of {result.query}, stopping.')
+            return True
+        return False
+
+
+    def _scrape(self, url_list: list[str]) -> tuple[dict[str, tuple[int, int]], set[str]]:
+        '''Scrapes `Indeed` for the given search URLs and adds any new jobs to the database.
+        Pages are fetched by a pool of `scraper_workers` workers, while this thread is the single database writer.
+        New job postings are passed to the Discord bot as soon as each batch is committed.
+
+        Returns the `(postings found, new postings)` of every query that was fetched, and the queries that failed.
+        A query that was neither, was skipped by the planner or interrupted by the killswitch.
+        The high-water mark of a query is only moved once its pagination was completed without failing.
+        '''
+
+        url_list = self.planner.plan(url_list)
+        self.normalizer.new_cycle()
         con, cur = self.indeed_db.get_con_cur()
         
         jobs_found: int = 0
         new_jobs_found: int = 0
-        job_id_regex: re.Pattern = re.compile('jk=([a-zA-Z0-9]*)&')
-        # scrape_job_ids: list[str] = []
+        writer = JobWriter(self.indeed_db, con, cur)
+
+        work_queue: queue.Queue = queue.Queue()
+        results_queue: queue.Queue = queue.Queue()
+        workers: list[threading.Thread] = []
+        query_results: dict[str, tuple[int, int]] = {}  # Query -> (postings found, new postings).
+        failed: set[str] = set()
+        completed: set[str] = set()  # Queries whose last page was reached.
+        newest: dict[str, tuple[str, str | None]] = {}
 
         try:
-            results = cur.execute('SELECT url FROM indeed_jobs')
-            url_results: list[tuple[str]] = results.fetchall()
-            job_ids_in_db: list[str] = []
-            if len(url_results):
-                url_list_db: list[str] = [url for url_tuple in url_results for url in url_tuple]
-                for url in url_list_db:
-                    try:
-                        job_ids_in_db.append(re.search(job_id_regex, url).group(1))
-                    except AttributeError:  # Ad in db.
-                        pass
-
-            with webdriver.Firefox(options=self.options) as driver:
-                for url in url_list:
-                    last_page = False
-                    while not last_page:
-                        if self.config.kill:
-                            return
-                        
-                        driver.get(url)
-                        time.sleep(self.config.selenium_sleep_sec)
-
-                        try:  # If pop-up, refresh.
-                            _ = driver.find_element(By.CSS_SELECTOR, "#mosaic-desktopserpjapopup")
-                            driver.get(url)
-                            time.sleep(self.config.selenium_sleep_sec)
-                        except NoSuchElementException:
-                            pass
-
-                        postings = driver.find_elements(By.CLASS_NAME, "job_seen_beacon")
-                        
-                        for posting in postings:
-                            jobs_found += 1
-                            job_url = posting.find_element(By.CLASS_NAME, "jcs-JobTitle").get_attribute("href")
-
-                            if "pagead" in job_url:
-                                continue
-
-                            try:
-                                job_id: str = re.search(job_id_regex, job_url).group(1)
-                                if job_id in job_ids_in_db:
-                                    continue
-                            except AttributeError:  # Ad.
-                                continue
-                                
-                            job_ids_in_db.append(job_id)
-                            
-                            posted = posting.find_element(By.CSS_SELECTOR, "[data-testid='myJobsStateDate']").text
-                            job_date_posted = self._get_date_posted(posted)
-                            if job_date_posted is None:
-                                continue
-
-                            job_title = posting.find_element(By.CLASS_NAME, 'jcs-JobTitle').find_element(By.CSS_SELECTOR, 'span').text
-                            job_employer = posting.find_element(By.CSS_SELECTOR, "[data-testid='company-name']").text
-                            description_parts = [paragraph.text for paragraph in posting.find_elements(By.CSS_SELECTOR, "li")]
-                            job_description = "\n".join([part for part in description_parts if part])
-                            self.indeed_db.insert_new_job(con, cur, job_url, job_title, job_employer, job_description, job_date_posted)
-                            new_jobs_found += 1
-
-                        try:  # Get next page URL
-                            url = driver.find_element(By.CSS_SELECTOR, "[data-testid='pagination-page-next']").get_attribute("href")
-                        except NoSuchElementException:
-                            last_page = True
+            if self.job_keys is None:
+                self.job_keys = self.indeed_db.get_job_keys(cur)
+            query_states: dict[str, tuple[str | None, str | None, bool]] = self.indeed_db.get_query_states()
+            self.indeed_db.start_queries(url_list)
+
+            for url in url_list:
+                work_queue.put((url, url, 1))
+            outstanding: int = len(url_list)
+
+            retries: dict[str, int] = {}
+            for _ in range(min(max(self.config.scraper_workers, 1), max(outstanding, 1))):
+                worker = threading.Thread(target=self._worker, args=(work_queue, results_queue), daemon=True)
+                worker.start()
+                workers.append(worker)
+
+            while outstanding and not self.config.kill:
+                try:
+                    result: PageResult = results_queue.get(timeout=1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        self.logger.error("All scraper workers have stopped.")
+                        break
+                    continue
+                outstanding -= 1
+
+                if result.error is not None:
+                    failed.add(result.query)
+                    continue
+
+                if result.blocked:
+                    retries[result.url] = retries.get(result.url, 0) + 1
+                    if retries[result.url] <= MAX_PAGE_RETRIES:
+                        work_queue.put((result.query, result.url, result.page))
+                        outstanding += 1
+                    else:
+                        self.logger.error(f'Giving up on {result.url} after {MAX_PAGE_RETRIES} retries.')
+                        failed.add(result.query)
+                    continue
+
+                jobs_found += result.found
+                metrics.inc("postings_found", result.found)
+                new_on_page: int = self._write_postings(result, writer, newest)
+                found, new = query_results.get(result.query, (0, 0))
+                query_results[result.query] = (found + len(result.job_keys), new + new_on_page)
+
+                if result.next_url and not self._stop_paginating(result, new_on_page, query_states.get(result.query)):
+                    work_queue.put((result.query, result.next_url, result.page + 1))
+                    outstanding += 1
+                else:
+                    completed.add(result.query)
 
         except Exception as e:
             self.logger.exception(e)
             self.config.kill = True
         finally:
+            try:
+                writer.flush()
+            except Exception as e:
+                self.logger.exception(e)
+                self.config.kill = True
+            new_jobs_found = writer.inserted
+            try:
+                self.indeed_db.update_query_states({query: state for query, state in newest.items() 
+                                                    if query in completed and query not in failed})
+                self.planner.record(query_results)
+            except Exception as e:
+                self.logger.exception(e)
+            for _ in workers:
+                work_queue.put(None)
+            for worker in workers:
+                worker.join()
             cur.close()
-            con.close()
-            self.indeed_db.busy = False
 
         self.logger.info(f'{jobs_found} jobs found, {new_jobs_found} new.')
-
-        if new_jobs_found:
-            self.indeed_db.new_jobs = True
+        return query_results, failed
 
     
     def scrape_loop(self):
-        '''Performs the scraping on a schedule according to the configuration options.'''
+        '''Performs the scraping on a per-query schedule according to the configuration options.
+        Every second, the queries that are due are scraped together and rescheduled from their outcome.
+        '''
 
-        while not self.config.kill:
-            # Taking the following approach in order to properly terminate the app without affecting potential db operations
-            # or waiting for the full scraper delay. This way the killswitch check happens every second.
-            start = datetime.now()
-            end = start + timedelta(seconds=self.config.scraper_delay_sec)
+        scheduler = QueryScheduler(self.config)
+        scheduler.add(self._shard_urls(self._construct_urls()))
 
-            self.logger.info("Starting to scrape Indeed...")
-            self._scrape()
+        if self.enricher is not None:
+            self.enricher.start()
+        # Parser processes are kept for the whole loop, rather than started for every batch of due queries.
+        if (self.config.extraction_mode == "html" or self.http_fetcher is not None) and self.config.parser_processes > 0:
+            self.parse_pool = ProcessPoolExecutor(self.config.parser_processes)
 
-            while datetime.now() < end:
-                if self.config.kill:
-                    break
+        try:
+            self._schedule(scheduler)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+            if self.enricher is not None:
+                self.enricher.stop()
+            self.close()
+
+
+    def close(self) -> None:
+        '''Closes the browser sessions and connections kept across scrapes.'''
+
+        self.drivers.close()
+        if self.http_fetcher is not None:
+            self.http_fetcher.close()
+        if self.replay_server is not None:
+            self.replay_server.close()
 
-                time.sleep(1)
+
+    def _schedule(self, scheduler: QueryScheduler) -> None:
+        '''Scrapes the queries of `scheduler` as they become due, until the application is signaled to close.'''
+
+        while not self.config.kill:
+            due: list[str] = scheduler.pop_due()
+            if due:
+                self.logger.info(f'Starting to scrape Indeed for {len(due)} queries...')
+                query_results: dict[str, tuple[int, int]] = {}
+                failed: set[str] = set()
+                try:
+                    with metrics.time("scrape_cycle"):
+                        query_results, failed = self._scrape(due)
+                except Exception as e:  # E.g. a database error while planning, before `_scrape` handles its own.
+                    self.logger.exception(e)
+                    self.config.kill = True
+                finally:
+                    for query in due:
+                        if query in failed:
+                            metrics.inc("query_failures")
+                            scheduler.fail(query)
+                        elif query in query_results:
+                            scheduler.complete(query, query_results[query][1])
+                        else:
+                            scheduler.defer(query)
+
+            # Taking the following approach in order to properly terminate the app without affecting potential db operations
+            # or waiting for the next query to be due. This way the killswitch check happens every second.
+            wait: float | None = scheduler.seconds_until_due()
+            time.sleep(1 if wait is None else min(wait, 1))
             
\ No newline at end of file
@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import Iterator
+
+
+class Metrics:
+
+    def __init__(self) -> None:
+        '''Thread-safe registry of counters and timers for the hot paths of the scraper, database and bot.
+        A timer keeps the number of observations, their total and their maximum, in seconds.
+        '''
+
+        self.lock: threading.Lock = threading.Lock()
+        self.started: float = time.time()
+        self.counters: dict[str, float] = {}
+        self.timers: dict[str, list[float]] = {}  # Name -> [count, total, max].
+
+
+    def inc(self, name: str, value: float = 1) -> None:
+        '''Increases counter `name` by `value`.'''
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def observe(self, name: str, seconds: float) -> None:
+        '''Records a duration of `seconds` for timer `name`.'''
+
+        with self.lock:
+            timer: list[float] | None = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        '''Times the enclosed block with timer `name`.'''
+
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+
+    def snapshot(self) -> dict:
+        '''Returns a copy of all counters and timers.'''
+
+        with self.lock:
+            return {
+                "uptime_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "timers": {name: {"count": int(count), "total": total, "max": maximum}
+                           for name, (count, total, maximum) in self.timers.items()}
+            }
+
+
+    def prometheus(self) -> str:
+        '''Returns all metrics in the `Prometheus` text exposition format.'''
+
+        snapshot: dict = self.snapshot()
+        lines: list[str] = [f'indeedjobs_uptime_seconds {snapshot["uptime_seconds"]:.0f}']
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'# TYPE indeedjobs_{name}_total counter')
+            lines.append(f'indeedjobs_{name}_total {value:g}')
+        for name, timer in sorted(snapshot["timers"].items()):
+            lines.append(f'# TYPE indeedjobs_{name}_seconds summary')
+            lines.append(f'indeedjobs_{name}_seconds_count {timer["count"]}')
+            lines.append(f'indeedjobs_{name}_seconds_sum {timer["total"]:.6f}')
+            lines.append(f'# TYPE indeedjobs_{name}_seconds_max gauge')  # Summaries only allow quantiles, `_sum` and `_count`.
+            lines.append(f'indeedjobs_{name}_seconds_max {timer["max"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+    def summary(self) -> str:
+        '''Returns a short human-readable summary of all metrics.'''
+
+        snapshot: dict = self.snapshot()
+        lines: list[str] = [f'Uptime: {snapshot["uptime_seconds"] / 3600:.1f} h']
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{name}: {value:g}')
+        for name, timer in sorted(snapshot["timers"].items()):
+            average_ms: float = timer["total"] / timer["count"] * 1000
+            lines.append(f'{name}: {timer["count"]} x {average_ms:.1f} ms avg, {timer["max"] * 1000:.1f} ms max, '
+                         f'{timer["total"]:.1f} s total')
+        return "\n".join(lines)
+
+
+    def dump(self, path: str | Path) -> None:
+        '''Writes a `JSON` snapshot of all metrics to `path`, through a temporary file replacing it, 
+        so that readers never see a partially written snapshot.
+        '''
+
+        path = Path(path)
+        tmp_path: Path | None = None  # Set while the temporary file exists and has not replaced `path`.
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f'{path.name}.', delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+                json.dump(self.snapshot(), tmp, indent=2)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        finally:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+
+
+# Registry shared by the whole application.
+metrics: Metrics = Metrics()
+
+
+class TimedLock:
+
+    def __init__(self, timer: str) -> None:
+        '''`threading.Lock` recording the time spent waiting to acquire it with timer `timer`.'''
+
+        self.lock: threading.Lock = threading.Lock()
+        self.timer: str = timer
+
+
+    def __enter__(self) -> bool:
+        start: float = time.perf_counter()
+        acquired: bool = self.lock.acquire()
+        metrics.observe(self.timer, time.perf_counter() - start)
+        return acquired
+
+
+    def __exit__(self, *_) -> None:
+        self.lock.release()
+
+
+class RateLimitCounter(logging.Handler):
+
+    def __init__(self) -> None:
+        '''Counts the Discord rate limits `discord.py` reports on the `discord.http` logger, where it handles them.'''
+
+        super().__init__(logging.WARNING)
+
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if "rate limit" in record.getMessage().lower():
+            metrics.inc("discord_rate_limits")
+
+
+class MetricsServer:
+
+    def __init__(self, port: int, host: str = "127.0.0.1") -> None:
+        '''Local HTTP server exposing all metrics at `/metrics` for `Prometheus`, and as `JSON` at `/metrics.json`.'''
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body: bytes = metrics.prometheus().encode()
+                    content_type: str = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.snapshot()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.httpd: ThreadingHTTPServer = ThreadingHTTPServer((host, port), Handler)
+        self.thread: threading.Thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+
+    def start(self) -> None:
+        self.thread.start()
+
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+import logging
+import re
+
+from .configuration import Config
+from .metrics import metrics
+
+
+# "Posted today", "Just posted", "Active today" and their translations on the localized `Indeed` sites.
+REGEX_TODAY: re.Pattern = re.compile(
+    r"today|just|heute|gerade|aujourd|instant|hoy|reci[eé]n|oggi|appena|vandaag|zojuist|dzisiaj|przed chwil|hoje|agora|"
+    r"idag|i dag|nyss|tänään|今日|本日|오늘", re.IGNORECASE)
+# Postings less than a day old, e.g. "3 hours ago", "vor 3 Stunden", "il y a 5 heures", "hace 2 horas".
+REGEX_HOURS: re.Pattern = re.compile(r"hour|\bhrs?\b|minut|\bmins?\b|stunde|heure|hora|\bore\b|uur|godzin|timm|tunti|時間|分|시간", re.IGNORECASE)
+# "Yesterday" and its translations.
+REGEX_YESTERDAY: re.Pattern = re.compile(r"yesterday|gestern|\bhier\b|ayer|\bieri\b|gisteren|wczoraj|ontem|igår|i går|eilen|昨日|어제", re.IGNORECASE)
+# Number of days, e.g. "3 days ago", "30+ days ago", "vor 3 Tagen", "il y a 2 jours", "3日前".
+REGEX_NUMBER: re.Pattern = re.compile(r"[0-9]+")
+
+
+class PostingNormalizer:
+
+    def __init__(self, config: Config) -> None:
+        '''Normalizes the relative "posted" dates of the results pages on every localized `Indeed` site to
+        `YYYY-MM-DD` dates. The patterns are compiled once, and the date of today and the result for every distinct
+        string are cached for the scrape cycle, as the same few strings repeat on every page.
+        '''
+
+        self.config: Config = config
+        self.today: date = date.today()
+        self.dates: dict[str, str | None] = {}
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def new_cycle(self) -> None:
+        '''Refreshes the date of today and clears the cache. Call at the start of every scrape cycle.'''
+
+        self.today = date.today()
+        self.dates = {}
+
+
+    def _days_ago(self, posted: str) -> int:
+        '''Returns how many days ago a posting was posted from its relative date.'''
+
+        if REGEX_TODAY.search(posted) or REGEX_HOURS.search(posted):
+            return 0
+        if REGEX_YESTERDAY.search(posted):
+            return 1
+
+        match: re.Match | None = REGEX_NUMBER.search(posted)
+        if match is not None:
+            return int(match.group())
+
+        # Not a date we know how to read. Results are sorted by date, so it is most likely a recent posting.
+        metrics.inc("unparsed_dates")
+        self.logger.warning(f'Could not parse posting date "{posted}", assuming today.')
+        return 0
+
+
+    def date_posted(self, posted: str) -> str | None:
+        '''Returns the date the job was posted in the format `YYYY-MM-DD`, or `None` if it is older than
+        `ignore_older_than_days` days.
+        '''
+
+        if posted in self.dates:
+            return self.dates[posted]
+
+        days: int = self._days_ago(posted)
+        result: str | None = None
+        if days <= self.config.ignore_older_than_days:
+            result = (self.today - timedelta(days=days)).strftime("%Y-%m-%d")
+
+        self.dates[posted] = result
+        return result
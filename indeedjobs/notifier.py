@@ -0,0 +1,131 @@
+import asyncio
+import logging
+
+import discord
+
+from .configuration import Config
+from .database import AsyncIndeedDb
+from .metrics import metrics
+from .utils import LruCache
+
+
+# Discord limits.
+MAX_MESSAGE_LENGTH: int = 2000
+MAX_EMBEDS_PER_MESSAGE: int = 10
+MAX_EMBED_CHARS_PER_MESSAGE: int = 6000
+DIGEST_DESCRIPTION_LENGTH: int = 400
+
+
+def format_job(job: tuple[int, str, str, str, str]) -> str:
+    '''Returns the notification text for a single `(id, url, job_title, employer, description)` job row.'''
+
+    text = '''**Id**: {}
+**URL**: {}
+**Title**: {}
+**Employer**: {}
+**Description**: {}'''.format(*job)
+    return text[:MAX_MESSAGE_LENGTH]
+
+
+def job_embed(job: tuple[int, str, str, str, str]) -> discord.Embed:
+    '''Returns the digest embed for a single `(id, url, job_title, employer, description)` job row.'''
+
+    job_id, url, job_title, employer, description = job
+    if len(description) > DIGEST_DESCRIPTION_LENGTH:
+        description = f'{description[:DIGEST_DESCRIPTION_LENGTH - 3]}...'
+
+    return discord.Embed(title=job_title[:256], url=url, description=f'**Id**: {job_id}\n**Employer**: {employer}\n{description}')
+
+
+class NotificationDispatcher:
+
+    def __init__(self, config: Config, adb: AsyncIndeedDb, message_jobs: LruCache) -> None:
+        '''Sends new job notifications to Discord with bounded concurrency and marks them as notified in one
+        batched update. There are no fixed sleeps between requests: `discord.py` already waits on Discord's
+        per-route rate-limit buckets and retries when limited.
+
+        With `notification_mode` `message`, every job gets its own message with ✅/❌ reactions.
+        With `digest`, several jobs are packed per message as embeds and triaged with the `!bulk` command,
+        as a reply cannot tell which of them it is about.
+
+        The message Id of every notification is recorded in the database and in `message_jobs`, so that 
+        reactions and replies can be resolved to their job without fetching the message.
+        '''
+
+        self.config: Config = config
+        self.adb: AsyncIndeedDb = adb
+        self.message_jobs: LruCache = message_jobs
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(max(config.notification_concurrency, 1))
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def _pack(self, jobs: list[tuple[int, str, str, str, str]]) -> list[list[tuple[int, str, str, str, str]]]:
+        '''Splits `jobs` into digests that fit Discord's per-message embed limits.'''
+
+        max_embeds: int = min(max(self.config.notification_digest_size, 1), MAX_EMBEDS_PER_MESSAGE)
+        digests: list[list[tuple[int, str, str, str, str]]] = []
+        digest: list[tuple[int, str, str, str, str]] = []
+        chars: int = 0
+
+        for job in jobs:
+            job_chars: int = len(job_embed(job))
+            if digest and (len(digest) >= max_embeds or chars + job_chars > MAX_EMBED_CHARS_PER_MESSAGE):
+                digests.append(digest)
+                digest, chars = [], 0
+            digest.append(job)
+            chars += job_chars
+
+        if digest:
+            digests.append(digest)
+        return digests
+
+
+    async def _send_message(self, channel: discord.TextChannel, job: tuple[int, str, str, str, str]) -> list[tuple[int, int]]:
+        '''Sends a single job with its reactions. Returns the `(job_id, message_id)` pair once the message is sent,
+        even if adding the reactions fails.
+        '''
+
+        async with self.semaphore:
+            with metrics.time("discord_send"):
+                message: discord.Message = await channel.send(format_job(job))
+            self.message_jobs.put(message.id, job[0])
+            try:
+                await message.add_reaction("✅")
+                await message.add_reaction("❌")
+            except Exception as e:  # The job was notified, it must not be sent again.
+                self.logger.warning(f'Failed to add reactions to the notification of job with Id: {job[0]}: {e!r}')
+                metrics.inc("reaction_failures")
+        return [(job[0], message.id)]
+
+
+    async def _send_digest(self, channel: discord.TextChannel, digest: list[tuple[int, str, str, str, str]]) -> list[tuple[int, int]]:
+        '''Sends several jobs as the embeds of a single message. Returns the `(job_id, message_id)` pairs.'''
+
+        async with self.semaphore:
+            with metrics.time("discord_send"):
+                message: discord.Message = await channel.send(embeds=[job_embed(job) for job in digest])
+        return [(job[0], message.id) for job in digest]
+
+
+    async def dispatch(self, channel: discord.TextChannel, jobs: list[tuple[int, str, str, str, str]]) -> int:
+        '''Notifies the user of `jobs` and marks the ones sent successfully as notified. Returns their number.'''
+
+        if self.config.notification_mode == "digest":
+            sends = [self._send_digest(channel, digest) for digest in self._pack(jobs)]
+        else:
+            sends = [self._send_message(channel, job) for job in jobs]
+
+        notified: list[tuple[int, int]] = []
+        try:
+            for result in await asyncio.gather(*sends, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    self.logger.error(f'Failed to send notification: {result!r}')
+                    metrics.inc("notification_failures")
+                    continue
+                notified.extend(result)
+        finally:
+            if notified:
+                await self.adb.mark_notified(notified)
+
+        metrics.inc("notifications_sent", len(notified))
+        return len(notified)
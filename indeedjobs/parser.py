@@ -0,0 +1,119 @@
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+
+from .utils import get_job_key
+
+
+def _class_xpath(class_name: str) -> str:
+    '''Returns an `XPath` predicate matching elements that have `class_name` among their classes.'''
+
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+# CSS selectors used with `Selenium` on the live page.
+# Any of these means the results page has rendered (postings, pagination or an explicit "no results" message).
+READY_SELECTOR: str = ".job_seen_beacon, [data-testid='pagination-page-next'], .jobsearch-NoResult-messageContainer"
+CHALLENGE_SELECTOR: str = "#challenge-form, #challenge-running, iframe[src*='challenges.cloudflare.com']"
+POPUP_SELECTOR: str = "#mosaic-desktopserpjapopup"
+# Full description on a job detail page.
+JOB_DESCRIPTION_SELECTOR: str = "#jobDescriptionText"
+
+# XPath equivalents used when parsing the page source offline.
+POSTINGS_XPATH: str = f'//*[{_class_xpath("job_seen_beacon")}]'
+TITLE_LINK_XPATH: str = f'.//a[{_class_xpath("jcs-JobTitle")}]'
+EMPLOYER_XPATH: str = './/*[@data-testid="company-name"]'
+POSTED_XPATH: str = './/*[@data-testid="myJobsStateDate"]'
+NEXT_PAGE_XPATH: str = '//a[@data-testid="pagination-page-next"]/@href'
+NO_RESULTS_XPATH: str = f'//*[{_class_xpath("jobsearch-NoResult-messageContainer")}]'
+CHALLENGE_XPATH: str = '//*[@id="challenge-form" or @id="challenge-running"] | //iframe[contains(@src, "challenges.cloudflare.com")]'
+POPUP_XPATH: str = '//*[@id="mosaic-desktopserpjapopup"]'
+JOB_DESCRIPTION_XPATH: str = '//*[@id="jobDescriptionText"]'
+SALARY_XPATH: str = '//*[@id="salaryInfoAndJobType"]'
+
+# Elements whose text starts on a new line.
+BLOCK_TAGS: tuple[str, ...] = ("p", "div", "li", "br", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr")
+
+
+def _text(element: lxml_html.HtmlElement | None) -> str:
+    '''Returns the whitespace-normalized text of `element`, or an empty string if it does not exist.'''
+
+    if element is None:
+        return ""
+    return " ".join(element.text_content().split())
+
+
+def _block_text(element: lxml_html.HtmlElement | None) -> str:
+    '''Returns the text of `element` with a line per paragraph, list item or other block, whitespace-normalized.'''
+
+    if element is None:
+        return ""
+    for block in element.iter(*BLOCK_TAGS):
+        block.tail = f'\n{block.tail or ""}'
+    lines: list[str] = [" ".join(line.split()) for line in element.text_content().splitlines()]
+    return "\n".join([line for line in lines if line])
+
+
+def _first(element: lxml_html.HtmlElement, xpath: str) -> lxml_html.HtmlElement | None:
+    '''Returns the first match of `xpath` under `element`, if any.'''
+
+    matches: list = element.xpath(xpath)
+    return matches[0] if matches else None
+
+
+def parse_results_page(page_source: str, url: str) -> dict:
+    '''Parses the raw HTML of an `Indeed` search results page, independently of the browser.
+
+    Returns a `dict` with the keys:
+    - `postings`: list of `dict`s with `job_key` (`None` for ads), `url`, `title`, `employer`, `description` and `posted`.
+    - `next_url`: absolute URL of the next results page, or `None` on the last page.
+    - `ready`: whether the page contains results, pagination or the "no results" message.
+    - `challenge`: whether the page is a `Cloudflare` challenge instead of results.
+    - `popup`: whether the page shows the sign-in pop-up covering the results.
+    '''
+
+    tree: lxml_html.HtmlElement = lxml_html.fromstring(page_source or "<html></html>")
+
+    postings: list[dict] = []
+    for card in tree.xpath(POSTINGS_XPATH):
+        link: lxml_html.HtmlElement | None = _first(card, TITLE_LINK_XPATH)
+        job_url: str = urljoin(url, link.get("href", "")) if link is not None else ""
+        title_span: lxml_html.HtmlElement | None = _first(link, ".//span") if link is not None else None
+        description_parts: list[str] = [_text(li) for li in card.iter("li")]
+
+        postings.append({
+            "job_key": None if "pagead" in job_url else get_job_key(job_url),
+            "url": job_url,
+            "title": _text(title_span),
+            "employer": _text(_first(card, EMPLOYER_XPATH)),
+            "description": "\n".join([part for part in description_parts if part]),
+            "posted": _text(_first(card, POSTED_XPATH))
+        })
+
+    next_hrefs: list[str] = tree.xpath(NEXT_PAGE_XPATH)
+
+    return {
+        "postings": postings,
+        "next_url": urljoin(url, next_hrefs[0]) if next_hrefs else None,
+        "ready": bool(postings or next_hrefs or tree.xpath(NO_RESULTS_XPATH)),
+        "challenge": bool(tree.xpath(CHALLENGE_XPATH)),
+        "popup": bool(tree.xpath(POPUP_XPATH))
+    }
+
+
+def parse_job_page(page_source: str) -> dict:
+    '''Parses the raw HTML of an `Indeed` job detail page.
+
+    Returns a `dict` with the keys:
+    - `description`: full text of the job description, a line per paragraph or list item. Empty if not found.
+    - `salary`: salary and job type as shown on the page, or an empty string.
+    - `challenge`: whether the page is a `Cloudflare` challenge instead of the job.
+    '''
+
+    tree: lxml_html.HtmlElement = lxml_html.fromstring(page_source or "<html></html>")
+
+    return {
+        "description": _block_text(_first(tree, JOB_DESCRIPTION_XPATH)),
+        "salary": _text(_first(tree, SALARY_XPATH)),
+        "challenge": bool(tree.xpath(CHALLENGE_XPATH))
+    }
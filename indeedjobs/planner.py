@@ -0,0 +1,60 @@
+import logging
+
+from .configuration import Config
+from .database import IndeedDb
+
+
+# Weight of the latest cycle in the moving average of the share of new postings of a query.
+YIELD_EMA_ALPHA: float = 0.3
+
+
+class SearchPlanner:
+
+    def __init__(self, config: Config, indeed_db: IndeedDb) -> None:
+        '''Plans which search queries to fetch in a scrape cycle, and in which order, from statistics of how many
+        of their postings were new in recent cycles (their yield), kept in the `query_stats` table.
+
+        Queries are fetched in order of decreasing yield, with queries not seen before first. Once a query has run
+        for `planner_warmup_cycles` cycles, if its yield is below `planner_min_yield` it is only fetched once every
+        `planner_throttle_every` cycles, leaving the fetch budget to the queries that surface new jobs.
+        '''
+
+        self.config: Config = config
+        self.indeed_db: IndeedDb = indeed_db
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def _throttled(self, cycles: int, yield_ema: float, skipped: int) -> bool:
+        '''Whether a query with the given statistics should be skipped this cycle.'''
+
+        return (cycles >= self.config.planner_warmup_cycles
+                and yield_ema < self.config.planner_min_yield
+                and skipped < self.config.planner_throttle_every - 1)
+
+
+    def plan(self, url_list: list[str]) -> list[str]:
+        '''Returns the queries of `url_list` to fetch this cycle, highest yield first.'''
+
+        stats: dict[str, tuple[int, float, int]] = self.indeed_db.get_query_stats()
+
+        planned: list[str] = []
+        skipped: list[str] = []
+        for url in url_list:
+            if url in stats and self._throttled(*stats[url]):
+                skipped.append(url)
+            else:
+                planned.append(url)
+
+        # Not seen before sorts as yield 1, so new queries are fetched first.
+        planned.sort(key=lambda url: stats[url][1] if url in stats else 1.0, reverse=True)
+
+        if skipped:
+            self.indeed_db.skip_queries(skipped)
+            self.logger.info(f'Skipping {len(skipped)} low-yield queries this cycle.')
+        return planned
+
+
+    def record(self, results: dict[str, tuple[int, int]]) -> None:
+        '''Records `(found, new)` posting counts for each query fetched this cycle.'''
+
+        self.indeed_db.update_query_stats(results, YIELD_EMA_ALPHA)
@@ -0,0 +1,160 @@
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+from pathlib import Path
+import threading
+from urllib.parse import urlsplit
+
+from .parser import CHALLENGE_SELECTOR, JOB_DESCRIPTION_SELECTOR, POPUP_SELECTOR, READY_SELECTOR, parse_job_page, parse_results_page
+
+
+def page_path(record_dir: str | Path, url: str) -> Path:
+    '''Returns the file path a page fetched from `url` is recorded to. The scheme is ignored, so the same
+    file is found whether the page is requested from `Indeed` or from a local `ReplayServer`.
+    '''
+
+    parts = urlsplit(url)
+    key: str = f'{parts.netloc}{parts.path}?{parts.query}'
+    return Path(record_dir) / f'{hashlib.sha1(key.encode()).hexdigest()}.html'
+
+
+def record_page(record_dir: str | Path, url: str, page_source: str) -> None:
+    '''Saves the `page_source` fetched from `url` to the recording directory.'''
+
+    path: Path = page_path(record_dir, url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(page_source, encoding="utf-8")
+
+
+def load_page(record_dir: str | Path, url: str) -> str:
+    '''Returns the recorded page source for `url`, or an empty page if it was never recorded.'''
+
+    path: Path = page_path(record_dir, url)
+    if not path.exists():
+        return ""
+    return path.read_text(encoding="utf-8")
+
+
+class ReplayDriver:
+
+    def __init__(self, record_dir: str | Path) -> None:
+        '''Stand-in for `webdriver.Firefox` serving pages recorded with `record_dir`, for offline runs and benchmarks.
+        Supports only the calls the scraper makes with the `script` and `html` extraction modes.
+        '''
+
+        self.record_dir: Path = Path(record_dir)
+        self.current_url: str = ""
+        self.page_source: str = ""
+        self._page: dict | None = None
+
+
+    def __enter__(self) -> "ReplayDriver":
+        return self
+
+
+    def __exit__(self, *_) -> None:
+        self.quit()
+
+
+    def _parsed(self) -> dict:
+        '''Parses the current page once, on first use.'''
+
+        if self._page is None:
+            self._page = parse_results_page(self.page_source, self.current_url)
+        return self._page
+
+
+    def get(self, url: str) -> None:
+        self.current_url = url
+        self.page_source = load_page(self.record_dir, url)
+        self._page = None
+
+
+    def find_elements(self, by: str, value: str) -> list[bool]:
+        '''Answers the readiness, challenge and pop-up checks of the scraper from the parsed page.'''
+
+        if value == JOB_DESCRIPTION_SELECTOR:
+            return [True] if parse_job_page(self.page_source)["description"] else []
+
+        flags: dict[str, str] = {READY_SELECTOR: "ready", CHALLENGE_SELECTOR: "challenge", POPUP_SELECTOR: "popup"}
+        if value not in flags:
+            raise NotImplementedError(f'Selector not supported in replay mode: {value}')
+        return [True] if self._parsed()[flags[value]] else []
+
+
+    def execute_script(self, script: str, *args) -> dict:
+        '''Returns what the postings extraction script returns on the live page.'''
+
+        page: dict = self._parsed()
+        return {
+            "postings": [{key: value for key, value in posting.items() if key != "job_key"} for posting in page["postings"]],
+            "next_url": page["next_url"]
+        }
+
+
+    def quit(self) -> None:
+        pass
+
+
+class ReplayServer:
+
+    def __init__(self, record_dir: str | Path, host: str = "127.0.0.1", port: int = 0) -> None:
+        '''Local HTTP server standing in for `Indeed`, serving pages recorded with `record_dir`.
+        A page recorded from `https://uk.indeed.com/jobs?q=x` is served at `http://{host}:{port}/uk.indeed.com/jobs?q=x`.
+        '''
+
+        self.record_dir: Path = Path(record_dir)
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self) -> None:
+                domain, _, path = self.path.lstrip("/").partition("/")
+                page_source: str = load_page(server.record_dir, f'https://{domain}/{path}')
+                body: bytes = page_source.encode("utf-8")
+
+                self.send_response(200 if page_source else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+
+            def log_message(self, format: str, *args) -> None:
+                server.logger.debug(format % args)
+
+        self.httpd: ThreadingHTTPServer = ThreadingHTTPServer((host, port), Handler)
+        self.thread: threading.Thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    def url_for(self, url: str) -> str:
+        '''Returns the local URL serving the page recorded for `url`.'''
+
+        parts = urlsplit(url)
+        return f'{self.base_url}/{parts.netloc}{parts.path}?{parts.query}'
+
+
+    def start(self) -> None:
+        self.thread.start()
+
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+    def __enter__(self) -> "ReplayServer":
+        self.start()
+        return self
+
+
+    def __exit__(self, *_) -> None:
+        self.close()
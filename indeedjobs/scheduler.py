@@ -0,0 +1,88 @@
+import heapq
+import logging
+import time
+
+from .configuration import Config
+
+
+class QueryScheduler:
+
+    def __init__(self, config: Config) -> None:
+        '''Schedules every search query on its own interval, kept in a heap keyed on the next time each is due.
+
+        Every query starts at `scraper_delay_sec`. The interval halves (down to `query_min_interval_sec`) after a run
+        that found new postings, and grows by half (up to `query_max_interval_sec`) after a run that found nothing new,
+        so busy searches are polled often and quiet ones rarely. A failed run is retried after `query_retry_sec`,
+        doubling on every consecutive failure up to the query's own interval, without affecting the other queries.
+        '''
+
+        self.config: Config = config
+        self.min_interval_sec: float = config.query_min_interval_sec
+        self.max_interval_sec: float = max(config.query_max_interval_sec, config.query_min_interval_sec)
+        self.heap: list[tuple[float, str]] = []
+        self.interval: dict[str, float] = {}
+        self.failures: dict[str, int] = {}
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval_sec), self.max_interval_sec)
+
+
+    def _push(self, query: str, delay: float) -> None:
+        heapq.heappush(self.heap, (time.monotonic() + delay, query))
+
+
+    def add(self, queries: list[str]) -> None:
+        '''Adds `queries` not already scheduled, due immediately.'''
+
+        for query in queries:
+            if query in self.interval:
+                continue
+            self.interval[query] = self._clamp(self.config.scraper_delay_sec)
+            self._push(query, 0)
+
+
+    def pop_due(self) -> list[str]:
+        '''Removes and returns the queries whose next run is due, in the order they became due.'''
+
+        now: float = time.monotonic()
+        due: list[str] = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap)[1])
+        return due
+
+
+    def seconds_until_due(self) -> float | None:
+        '''Returns the seconds until the next query is due, or `None` if no query is scheduled.'''
+
+        if not self.heap:
+            return None
+        return max(self.heap[0][0] - time.monotonic(), 0)
+
+
+    def complete(self, query: str, new_postings: int) -> None:
+        '''Reschedules `query` after a successful run that added `new_postings` jobs.'''
+
+        self.failures.pop(query, None)
+        interval: float = self.interval[query]
+        interval = self._clamp(interval / 2 if new_postings else interval * 1.5)
+        self.interval[query] = interval
+        self._push(query, interval)
+        self.logger.debug(f'{query}: {new_postings} new, next run in {interval:.0f}s.')
+
+
+    def fail(self, query: str) -> None:
+        '''Reschedules `query` for a retry after a failed run, backing off on consecutive failures.'''
+
+        failures: int = self.failures.get(query, 0) + 1
+        self.failures[query] = failures
+        delay: float = min(self.config.query_retry_sec * 2 ** (failures - 1), self.interval[query])
+        self._push(query, delay)
+        self.logger.warning(f'{query} failed {failures} time(s) in a row, retrying in {delay:.0f}s.')
+
+
+    def defer(self, query: str) -> None:
+        '''Reschedules `query` one interval later, unchanged, when it was due but not run.'''
+
+        self._push(query, self.interval[query])
@@ -0,0 +1,324 @@
+import logging
+from multiprocessing.connection import Client, Connection, Listener
+import multiprocessing
+import os
+from pathlib import Path
+import threading
+import time
+
+from .configuration import Config
+from .database import IndeedDb
+from .indeed import IndeedScraper
+from .metrics import metrics
+
+
+# `IndeedDb` methods the scraper processes call on the writer process.
+SHARD_METHODS: frozenset[str] = frozenset({
+    "get_job_keys", "get_query_states", "start_queries", "update_query_states", "insert_jobs",
+    "get_query_stats", "update_query_stats", "skip_queries"
+})
+SHARD_RECONNECT_MAX_SEC: float = 30
+SHARD_RESTART_DELAY_SEC: float = 10
+SHARD_STOP_TIMEOUT_SEC: float = 120
+
+
+class ShardServer:
+
+    def __init__(self, config: Config, indeed_db: IndeedDb) -> None:
+        '''Serves the `IndeedDb` calls of the scraper processes in the writer process, applying each request once.'''
+
+        self.config: Config = config
+        self.indeed_db: IndeedDb = indeed_db
+        self.authkey: bytes = os.urandom(32)
+        self.listener: Listener = Listener(("127.0.0.1", config.shard_port), authkey=self.authkey)
+        self.address: tuple[str, int] = self.listener.address
+        self.lock: threading.Lock = threading.Lock()
+        self.acks: dict[int, tuple[str, tuple[int, bool, object]]] = {}  # Shard -> (session, last response).
+        self.thread: threading.Thread = threading.Thread(target=self._accept, daemon=True)
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def start(self) -> None:
+        self.thread.start()
+
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn: Connection = self.listener.accept()
+            except OSError:  # Listener closed.
+                break
+            except Exception as e:  # Failed authentication or handshake, keep serving the others.
+                self.logger.warning(f'Rejected scraper process connection: {e}')
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+
+    def _call(self, method: str, args: tuple) -> object:
+        '''Calls `method` of the database on behalf of a scraper process, with a cursor of this thread if it takes one.'''
+
+        if method not in SHARD_METHODS:
+            raise ValueError(f'Method {method} cannot be called by scraper processes.')
+
+        if method == "get_job_keys":
+            con, cur = self.indeed_db.get_con_cur()
+            try:
+                return self.indeed_db.get_job_keys(cur)
+            finally:
+                cur.close()
+
+        if method == "insert_jobs":
+            con, cur = self.indeed_db.get_con_cur()
+            try:
+                job_ids: list[int] = self.indeed_db.insert_jobs(con, cur, *args)
+            finally:
+                cur.close()
+            self.indeed_db.publish_new_jobs(job_ids)
+            return job_ids
+
+        return getattr(self.indeed_db, method)(*args)
+
+
+    def _serve(self, conn: Connection) -> None:
+        '''Answers the requests of a single scraper process connection until it is closed.'''
+
+        with conn:
+            try:
+                shard, session = conn.recv()
+                self.logger.info(f'Scraper process {shard} connected.')
+                while True:
+                    seq, method, args = conn.recv()
+
+                    with self.lock:
+                        ack: tuple[str, tuple[int, bool, object]] | None = self.acks.get(shard)
+                    if ack is not None and ack[0] == session and ack[1][0] == seq:
+                        metrics.inc("shard_resends")
+                        conn.send(ack[1])
+                        continue
+
+                    try:
+                        with metrics.time("shard_request"):
+                            response: tuple[int, bool, object] = (seq, True, self._call(method, args))
+                    except Exception as e:
+                        self.logger.exception(e)
+                        response = (seq, False, repr(e))
+                    with self.lock:
+                        self.acks[shard] = (session, response)
+                    conn.send(response)
+            except (EOFError, OSError):
+                self.logger.info("Scraper process connection closed.")
+            finally:
+                self.indeed_db.close_thread_connection()
+
+
+class _RemoteCursor:
+    '''Placeholder for the cursor the scraper opens and closes around a cycle, the writer uses its own.'''
+
+    def close(self) -> None:
+        pass
+
+
+class ShardDbClient:
+
+    def __init__(self, config: Config, shard: int, address: tuple[str, int], authkey: bytes) -> None:
+        '''Stands in for `IndeedDb` in a scraper process, resending each call to the `ShardServer` until acknowledged.'''
+
+        self.config: Config = config
+        self.shard: int = shard
+        self.address: tuple[str, int] = address
+        self.authkey: bytes = authkey
+        self.session: str = os.urandom(8).hex()  # Sequence numbers restart with the process.
+        self.seq: int = 0
+        self.conn: Connection | None = None
+        self.lock: threading.Lock = threading.Lock()
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+    def _request(self, method: str, *args) -> object:
+        '''Sends a request to the writer process and returns its result once acknowledged.'''
+
+        with self.lock:
+            self.seq += 1
+            request: tuple[int, str, tuple] = (self.seq, method, args)
+            delay: float = 1
+            while True:
+                try:
+                    if self.conn is None:
+                        self.conn = Client(self.address, authkey=self.authkey)
+                        self.conn.send((self.shard, self.session))
+                    self.conn.send(request)
+                    seq, ok, result = self.conn.recv()
+                    break
+                except (EOFError, OSError) as e:
+                    self.close()
+                    if self.config.kill:
+                        raise ConnectionError(f'Writer process unreachable while closing: {e}')
+                    self.logger.warning(f'Lost the writer process ({e}), resending in {delay:.0f}s.')
+                    end: float = time.monotonic() + delay
+                    while (remaining := end - time.monotonic()) > 0 and not self.config.kill:
+                        time.sleep(min(remaining, 1))
+                    delay = min(delay * 2, SHARD_RECONNECT_MAX_SEC)
+
+        if not ok:
+            raise RuntimeError(f'Writer process failed {method}: {result}')
+        return result
+
+
+    def get_con_cur(self) -> tuple[None, _RemoteCursor]:
+        return None, _RemoteCursor()
+
+
+    def add_new_jobs_listener(self, listener) -> None:
+        '''New jobs are published in the writer process.'''
+
+
+    def publish_new_jobs(self, job_ids: list[int]) -> None:
+        '''New jobs are published in the writer process.'''
+
+
+    def get_job_keys(self, cur: _RemoteCursor) -> set[str]:
+        return self._request("get_job_keys")
+
+
+    def get_query_states(self) -> dict[str, tuple[str | None, str | None, bool]]:
+        return self._request("get_query_states")
+
+
+    def start_queries(self, queries: list[str]) -> None:
+        self._request("start_queries", queries)
+
+
+    def update_query_states(self, newest: dict[str, tuple[str, str | None]]) -> None:
+        self._request("update_query_states", newest)
+
+
+    def insert_jobs(self, con: None, cur: _RemoteCursor, jobs: list[tuple[str, str, str, str, str, str]]) -> list[int]:
+        return self._request("insert_jobs", jobs)
+
+
+    def get_query_stats(self) -> dict[str, tuple[int, float, int]]:
+        return self._request("get_query_stats")
+
+
+    def update_query_stats(self, results: dict[str, tuple[int, int]], alpha: float) -> None:
+        self._request("update_query_stats", results, alpha)
+
+
+    def skip_queries(self, queries: list[str]) -> None:
+        self._request("skip_queries", queries)
+
+
+def run_shard(config_path: str, log_path: str, shard: int, address: tuple[str, int], authkey: bytes,
+              stop: Connection) -> None:
+    '''Entry point of a scraper process. Scrapes the searches of shard `shard` until the writer process signals it 
+    through the pipe `stop`, or exits and closes it. Background enrichment runs in the writer process, so it is 
+    disabled here.
+    '''
+
+    logging.basicConfig(filename=log_path,
+                        level=logging.INFO,
+                        format="%(asctime)s|%(levelname)8s|%(processName)s|%(name)s|%(message)s")
+
+    config = Config(Path(config_path))
+    config.enrichment_enabled = False
+
+    def watch() -> None:
+        while not config.kill:
+            if stop.poll(1):  # Signaled, or end of file once the writer process is gone.
+                config.kill = True
+    threading.Thread(target=watch, daemon=True).start()
+
+    indeed_db = ShardDbClient(config, shard, address, authkey)
+    scraper = IndeedScraper(config, indeed_db)
+    scraper.shard = (shard, config.shards)
+    try:
+        scraper.scrape_loop()
+    finally:
+        indeed_db.close()
+
+
+class ShardSupervisor:
+
+    def __init__(self, config: Config, config_path: Path, log_path: Path, indeed_db: IndeedDb, scraper: IndeedScraper) -> None:
+        '''Runs the scraping as `shards` scraper processes feeding this writer process, restarting any that exit.'''
+
+        self.config: Config = config
+        self.config_path: Path = config_path
+        self.log_path: Path = log_path
+        self.scraper: IndeedScraper = scraper
+        self.server: ShardServer = ShardServer(config, indeed_db)
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        # A pipe per process rather than a shared event, whose lock a killed process could leave held.
+        self.stops: dict[int, Connection] = {}
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+
+    def _start(self, shard: int) -> multiprocessing.process.BaseProcess:
+        if shard in self.stops:
+            self.stops[shard].close()
+        receiver, self.stops[shard] = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=run_shard, name=f'shard-{shard}',
+                                       args=(str(self.config_path), str(self.log_path), shard,
+                                             self.server.address, self.server.authkey, receiver))
+        process.start()
+        receiver.close()
+        return process
+
+
+    def run(self) -> None:
+        self.server.start()
+        if self.scraper.enricher is not None:
+            self.scraper.enricher.start()
+
+        processes: dict[int, multiprocessing.process.BaseProcess] = self.processes
+        started: dict[int, float] = {}
+        try:
+            for shard in range(self.config.shards):
+                processes[shard] = self._start(shard)
+                started[shard] = time.monotonic()
+            self.logger.info(f'Started {self.config.shards} scraper processes sharded by {self.config.shard_by}.')
+
+            while not self.config.kill:
+                for shard, process in processes.items():
+                    if process.is_alive() or time.monotonic() - started[shard] < SHARD_RESTART_DELAY_SEC:
+                        continue
+                    metrics.inc("shard_restarts")
+                    self.logger.warning(f'Scraper process {shard} exited with code {process.exitcode}, restarting.')
+                    processes[shard] = self._start(shard)
+                    started[shard] = time.monotonic()
+                time.sleep(1)
+
+        except Exception as e:
+            self.logger.exception(e)
+            self.config.kill = True
+        finally:
+            # Keep serving while the processes finish their last pages and send them.
+            for stop in self.stops.values():
+                try:
+                    stop.send(None)
+                except OSError:  # The process already exited.
+                    pass
+            deadline: float = time.monotonic() + SHARD_STOP_TIMEOUT_SEC
+            for shard, process in processes.items():
+                process.join(max(deadline - time.monotonic(), 0))
+                if process.is_alive():
+                    self.logger.warning(f'Scraper process {shard} did not stop in time, terminating.')
+                    process.terminate()
+                    process.join()
+            for stop in self.stops.values():
+                stop.close()
+            self.server.close()
+            if self.scraper.enricher is not None:
+                self.scraper.enricher.stop()
+            self.scraper.close()
@@ -1,54 +1,113 @@
+from collections import OrderedDict
 import datetime
+import os
 from pathlib import Path
 import re
+import shutil
+import tempfile
+from typing import BinaryIO, Hashable
+
+
+# Timestamp at the start of every log record, as formatted by `main`. Continuation lines (e.g. tracebacks) have none.
+REGEX_LOG_TIMESTAMP: re.Pattern = re.compile(rb"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d{3}\|")
+
+
+def _next_log_timestamp(f: BinaryIO, offset: int) -> tuple[int, bytes | None]:
+    '''Returns the offset and timestamp of the first timestamped log line starting at or after byte `offset`,
+    or the end of the file and `None` if there is none.
+    '''
+
+    f.seek(max(offset - 1, 0))
+    if offset > 0:
+        f.readline()  # Skip to the end of the line containing `offset - 1`.
+
+    while True:
+        line_start: int = f.tell()
+        line: bytes = f.readline()
+        if not line:
+            return line_start, None
+        match: re.Match | None = REGEX_LOG_TIMESTAMP.match(line)
+        if match is not None:
+            return line_start, match.group(1)
 
 
 def maintain_log(log_path: Path, days: int) -> None:
-    '''Function to maintain the log file by removing entries older than `days` days.'''
+    '''Function to maintain the log file by removing entries older than `days` days.
+
+    Log lines are in time order, so the first line to keep is found by binary search over byte offsets, comparing
+    timestamps as strings, and only the kept tail is streamed to a temporary file that atomically replaces the log.
+    The temporary file is removed if it could not replace the log. Must run before the log file is opened by a
+    logging handler.
+    '''
 
     if not log_path.exists():
         return
-    
-    new_log: str = ""
-    add_rest: bool = False
-    first_timestamp: bool = True
-
-    with open(log_path, "r") as f:
-        log_lines: list[str] = f.readlines()
-
-    for index, line in enumerate(log_lines):
-        parts: list[str] = line.split("|")
-        if not len(parts) == 4:
-            continue
-        date: str = parts[0][:-4]
-        timestamp: float = datetime.datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp()
-
-        cutoff: int = days * 24 * 60 * 60  # Remove logs older than `days` days.
-        
-        if datetime.datetime.now().timestamp() - timestamp > cutoff:
-            first_timestamp = False
-            continue
-        if first_timestamp:  # First timestamp is not older than 30 days, no need to continue.
-            return
-        if not add_rest:
-            add_rest = True
-        
-        if add_rest:
-            rest: str = "".join(log_lines[index:])
-            new_log = f'{new_log}{rest}'
-            break
-
-    with open(log_path, "w") as f:
-        f.write(new_log)
+
+    cutoff: bytes = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S").encode()
+
+    tmp_path: Path | None = None  # Set while the temporary file exists and has not replaced the log.
+    try:
+        with open(log_path, "rb") as f:
+            low: int = 0
+            high: int = f.seek(0, os.SEEK_END)
+            while low < high:
+                middle: int = (low + high) // 2
+                _, timestamp = _next_log_timestamp(f, middle)
+                if timestamp is None or timestamp >= cutoff:
+                    high = middle
+                else:
+                    low = middle + 1
+
+            keep_from, _ = _next_log_timestamp(f, low)
+            if keep_from == 0:  # First timestamp is not older than `days` days, nothing to remove.
+                return
+
+            f.seek(keep_from)
+            with tempfile.NamedTemporaryFile("wb", dir=log_path.parent, prefix=f'{log_path.name}.', delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+                shutil.copyfileobj(f, tmp)
+
+        os.replace(tmp_path, log_path)  # Fails on Windows while another process has the log open.
+        tmp_path = None
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+class LruCache:
+
+    def __init__(self, capacity: int) -> None:
+        '''Simple least-recently-used cache, evicting the oldest entry once `capacity` is exceeded.'''
+
+        self.capacity: int = capacity
+        self.entries: OrderedDict = OrderedDict()
+
+
+    def get(self, key: Hashable) -> object | None:
+        '''Returns the value cached for `key`, or `None`.'''
+
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+
+    def put(self, key: Hashable, value: object) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
 
 
 DISCORD_HELP = '''# Help:
 ## Config Channel:
 `!close            `: Close application.
+`!search {terms}   `: Sends the jobs best matching `terms` in their title, employer or description.
+`!stats            `: Sends a summary of the scraper and bot metrics.
 
 ## Notification Channel:
 - React with ✅ to mark interested, or ❌ to delete message.
-- Reply with the following commands to swap/set the related field in the database for `job id` in the original message
+- Reply with the following commands to swap/set the related field in the database for `job id` in the original message (not for digest messages, use `!bulk`)
 
 `!interview {operation} `: Increases/decreases interviews by depending on operation: `+`(default) or `-`.
 `!applied:              `: Swaps value for `applied` boolean.
@@ -56,10 +115,25 @@ DISCORD_HELP = '''# Help:
 `!rejected:             `: Swaps value for `rejected` boolean.
 `!offer:                `: Swaps value for `job_offer` boolean.
 
+Or send the following command to update many jobs at once:
+
+`!bulk {action} {ids}   `: Applies `action` to all job ids. Actions: `interested`, `uninterested`, `interview`, `applied`, `response`, `rejected`, `offer`.
+
 For complete documentation please visit: https://github.com/AntonisTorb/Indeed-Jobs'''
  
 REGEX_ID_FROM_DISCORD: re.Pattern = re.compile(r"\*\*Id\*\*: ([0-9]+)")
 
+REGEX_JOB_KEY_FROM_URL: re.Pattern = re.compile(r"[?&]jk=([a-zA-Z0-9]+)")
+
+
+def get_job_key(url: str) -> str | None:
+    '''Returns the `Indeed` job key (the `jk` URL parameter) for the posting URL, or `None` for ads.'''
+
+    match: re.Match | None = REGEX_JOB_KEY_FROM_URL.search(url)
+    if match is None:
+        return None
+    return match.group(1)
+
 INDEED_COUNTRIES = {
     "argentina": "ar",
     "australia": "au",
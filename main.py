@@ -4,6 +4,8 @@ import threading
 import time
 
 from indeedjobs import Config, DiscordBot, IndeedDb, IndeedScraper, maintain_log
+from indeedjobs.metrics import MetricsServer, metrics
+from indeedjobs.sharding import ShardSupervisor
 
 
 def main() -> None:
@@ -17,19 +19,37 @@ def main() -> None:
     else:
         log_path = cwd / "IndeedJobs.log"
         
+    log_error: Exception | None = None
+    try:
+        maintain_log(log_path, 30)  # Before the log file is opened by the logging handler, as it gets replaced.
+    except Exception as e:  # Logged once logging is configured.
+        log_error = e
+
     main_logger: logging.Logger = logging.getLogger(__name__)
     logging.basicConfig(filename=log_path, 
                         level=logging.INFO,
                         format="%(asctime)s|%(levelname)8s|%(name)s|%(message)s")
+    if log_error is not None:  # An untrimmed log is not a reason to stop.
+        main_logger.warning(f'Could not trim the log file, continuing without trimming: {log_error!r}')
+
+    metrics_server: MetricsServer | None = None
+    last_dump: float = time.monotonic()
 
     try:
-        maintain_log(log_path, 30)
+        if config.metrics_port:
+            metrics_server = MetricsServer(config.metrics_port)
+            metrics_server.start()
+
         indeed_db: IndeedDb = IndeedDb(config)
         indeed_db.create_adapters_converters()
         indeed_db.create_table()
 
         scraper: IndeedScraper = IndeedScraper(config, indeed_db)
-        scraper_thread: threading.Thread = threading.Thread(target=scraper.scrape_loop)
+        if config.shards > 0:  # Scrape in separate processes, this one only writes to the database.
+            supervisor: ShardSupervisor = ShardSupervisor(config, config_path, log_path, indeed_db, scraper)
+            scraper_thread: threading.Thread = threading.Thread(target=supervisor.run)
+        else:
+            scraper_thread = threading.Thread(target=scraper.scrape_loop)
 
         bot: DiscordBot = DiscordBot(config, indeed_db)
         bot_thread: threading.Thread = threading.Thread(target=bot.run)
@@ -49,9 +69,25 @@ def main() -> None:
             while scraper_thread.is_alive() or bot_thread.is_alive():
                 time.sleep(1)
 
+            indeed_db.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            if config.metrics_json_path:
+                try:
+                    metrics.dump(config.metrics_json_path)
+                except Exception as e:
+                    main_logger.error(f'Could not write metrics to {config.metrics_json_path}: {e!r}')
+
             main_logger.info("Closing application.")
             break
 
+        if config.metrics_json_path and time.monotonic() - last_dump >= config.metrics_dump_sec:
+            try:
+                metrics.dump(config.metrics_json_path)
+            except Exception as e:  # Must not end the main loop, which stops the other threads.
+                main_logger.error(f'Could not write metrics to {config.metrics_json_path}: {e!r}')
+            last_dump = time.monotonic()
+
         try:
             time.sleep(1)
         except KeyboardInterrupt:  # Manual shutdown.